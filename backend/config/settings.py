@@ -110,6 +110,72 @@ else:
 }
 
 
+# Cache
+# Catalog responses are cached and invalidated by a version key, which only
+# works with a cache shared by all workers: point REDIS_URL at one in
+# production. Without it the catalog cache is bypassed.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60 * 60))
+
+# Write-behind progress: watch events are buffered and applied by
+# `manage.py flush_watch_events --loop` every PROGRESS_FLUSH_INTERVAL seconds.
+PROGRESS_WRITE_BEHIND = os.getenv('PROGRESS_WRITE_BEHIND', 'False').lower() == 'true'
+PROGRESS_FLUSH_INTERVAL = int(os.getenv('PROGRESS_FLUSH_INTERVAL', 10))
+
+# Player heartbeats are persisted at most once per interval (seconds) per
+# enrollment; without a shared cache (REDIS_URL) every heartbeat is persisted.
+PLAYBACK_PERSIST_INTERVAL = int(os.getenv('PLAYBACK_PERSIST_INTERVAL', 30))
+
+# Analytics rollups skip rows younger than this many seconds, so rows of
+# transactions still in flight are counted by a later run.
+ROLLUP_SAFETY_LAG = int(os.getenv('ROLLUP_SAFETY_LAG', 60))
+
+# Browsers may reuse downloaded certificates/course PDFs for this many seconds
+# (private cache only) before revalidating them with their ETag.
+DOWNLOAD_MAX_AGE = int(os.getenv('DOWNLOAD_MAX_AGE', 3600))
+
+# Signed Cloudinary download URLs handed to authorized users expire after this
+# many seconds.
+DOWNLOAD_URL_MAX_AGE = int(os.getenv('DOWNLOAD_URL_MAX_AGE', 15 * 60))
+
+# Public certificate verification answers are cached by browsers/proxies;
+# unknown codes only briefly, so a newly issued certificate verifies soon.
+VERIFICATION_MAX_AGE = int(os.getenv('VERIFICATION_MAX_AGE', 24 * 60 * 60))
+VERIFICATION_NOT_FOUND_MAX_AGE = int(os.getenv('VERIFICATION_NOT_FOUND_MAX_AGE', 60))
+
+# Recompute enrollment progress in a background thread after video changes
+# (set to False to run it inline, e.g. in tests).
+PROGRESS_RECOMPUTE_ASYNC = os.getenv('PROGRESS_RECOMPUTE_ASYNC', 'True').lower() == 'true'
+
+# Certificate PDFs are rendered by a pool of worker processes (set
+# CERTIFICATE_RENDER_ASYNC to False to render inline, e.g. in tests).
+# Template assets are file paths. CERTIFICATE_FONT must be an Arabic TTF font
+# such as Amiri: the courses.E001 system check stops startup without one
+# unless CERTIFICATE_RENDERING is False (certificates then stay "pending"
+# until `manage.py render_pending_certificates` runs with a font).
+CERTIFICATE_RENDERING = os.getenv('CERTIFICATE_RENDERING', 'True').lower() == 'true'
+CERTIFICATE_RENDER_ASYNC = os.getenv('CERTIFICATE_RENDER_ASYNC', 'True').lower() == 'true'
+CERTIFICATE_RENDER_WORKERS = int(os.getenv('CERTIFICATE_RENDER_WORKERS', 2))
+CERTIFICATE_BACKGROUND = os.getenv('CERTIFICATE_BACKGROUND', '')
+CERTIFICATE_SIGNATURE = os.getenv('CERTIFICATE_SIGNATURE', '')
+CERTIFICATE_FONT = os.getenv('CERTIFICATE_FONT', '')
+CERTIFICATE_BOLD_FONT = os.getenv('CERTIFICATE_BOLD_FONT', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -183,7 +249,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'courses.pagination.SelectablePagination',
     'PAGE_SIZE': 10,
 }
 
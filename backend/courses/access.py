@@ -0,0 +1,64 @@
+"""
+Enrollment-based access checks.
+
+The set of course ids a user is enrolled in is loaded once and cached, so
+gating content on enrollment normally costs no query. Enrollment signals (see
+``courses.signals``) invalidate the cached set; code that writes enrollments
+without signals (bulk_create, raw SQL) must call
+``invalidate_enrolled_courses`` itself.
+
+Invalidations only reach other workers through a shared cache. With a
+process-local cache (LocMem, the default without REDIS_URL) the set is kept
+for a few seconds only, and a course missing from it is checked against the
+database, so an enrollment made through another worker is seen at once and a
+removed one within ``ENROLLED_COURSES_LOCAL_TIMEOUT`` seconds.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import shared_cache_configured
+from .models import Enrollment
+
+
+ENROLLED_COURSES_TIMEOUT = 24 * 60 * 60
+ENROLLED_COURSES_LOCAL_TIMEOUT = 5
+
+
+def enrolled_courses_cache_key(user_id):
+    return f'enrollments:courses:{user_id}'
+
+
+def enrolled_course_ids(user):
+    """Return the frozenset of ids of the courses ``user`` is enrolled in."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    key = enrolled_courses_cache_key(user.pk)
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = frozenset(Enrollment.objects.filter(user_id=user.pk).values_list('course_id', flat=True))
+        timeout = ENROLLED_COURSES_TIMEOUT if shared_cache_configured() else ENROLLED_COURSES_LOCAL_TIMEOUT
+        cache.set(key, course_ids, timeout)
+    return course_ids
+
+
+def is_enrolled(user, course_id):
+    """Whether ``user`` is enrolled in the course with id ``course_id``."""
+    if course_id is None:
+        return False
+    if int(course_id) in enrolled_course_ids(user):
+        return True
+    if user is None or not user.is_authenticated or shared_cache_configured():
+        return False
+    # Enrollments made through another worker did not invalidate this process' cache
+    if Enrollment.objects.filter(user_id=user.pk, course_id=course_id).exists():
+        cache.delete(enrolled_courses_cache_key(user.pk))
+        return True
+    return False
+
+
+def invalidate_enrolled_courses(*user_ids):
+    """Drop the cached enrolled-course sets of ``user_ids``."""
+    keys = [enrolled_courses_cache_key(user_id) for user_id in set(user_ids)]
+    cache.delete_many(keys)
+    # A request reading between the write and the commit may have cached the old set
+    transaction.on_commit(lambda: cache.delete_many(keys))
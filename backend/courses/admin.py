@@ -35,6 +35,9 @@ class CourseAdmin(admin.ModelAdmin):
             'fields': ('is_published',)
         }),
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_stats()
 
 
 @admin.register(Video)
@@ -78,7 +81,7 @@ class CertificateAdmin(admin.ModelAdmin):
     
       
     # Fields that can't be edited manually
-    readonly_fields = ( 'issue_date',)
+    readonly_fields = ( 'issue_date', 'verification_code')
 
     # Columns to show in the list view
     list_display = ( 'user', 'course', 'issue_date')
@@ -90,7 +93,7 @@ class CertificateAdmin(admin.ModelAdmin):
     ordering = ('-issue_date',)
 
     # Optional: search bar for easier lookup
-    search_fields = ( 'user__username', 'course__title')
+    search_fields = ( 'user__username', 'course__title', 'verification_code')
 
 
 @admin.register(Feedback)
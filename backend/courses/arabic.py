@@ -0,0 +1,50 @@
+"""
+Arabic text shaping for PDF rendering.
+
+reportlab draws glyphs one by one, left to right, so Arabic text has to be
+converted to its presentation forms (joined letters, ligatures) and put
+into visual order before drawing. Shaping is relatively slow, and course
+titles and coach names repeat across thousands of certificates, so shaped
+strings are cached per process.
+
+``arabic_reshaper`` and ``python-bidi`` are optional: without them text is
+drawn unshaped (correct for Latin names, disconnected for Arabic).
+"""
+import logging
+import re
+from functools import lru_cache
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:  # pragma: no cover - optional dependencies
+    arabic_reshaper = None
+    get_display = None
+
+
+logger = logging.getLogger(__name__)
+
+SHAPED_CACHE_SIZE = 4096
+
+# Hebrew, Arabic (+ supplement/extended) and their presentation forms
+RTL_CHARACTERS = re.compile('[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufefc]')
+
+_warned = False
+
+
+def shaping_available():
+    return arabic_reshaper is not None
+
+
+@lru_cache(maxsize=SHAPED_CACHE_SIZE)
+def shape(text):
+    """Return ``text`` ready to be drawn left to right (cached)."""
+    global _warned
+    if not text or not RTL_CHARACTERS.search(text):
+        return text
+    if not shaping_available():
+        if not _warned:
+            logger.warning('arabic_reshaper/python-bidi are not installed; Arabic text is drawn unshaped.')
+            _warned = True
+        return text
+    return get_display(arabic_reshaper.reshape(text))
@@ -0,0 +1,64 @@
+"""
+Watched-video bitmaps.
+
+Every video gets a ``slot`` within its course when it is created; slots are
+never reused or renumbered, so reordering videos leaves bitmaps untouched.
+An enrollment stores the slots of its watched videos as a little-endian
+bitmap (bit ``n`` is bit ``n % 8`` of byte ``n // 8``), which keeps the row a
+few bytes long even for long courses and turns "is watched", counts and
+unions into bit operations.
+"""
+
+
+def _as_int(bitmap):
+    return int.from_bytes(bytes(bitmap or b''), 'little')
+
+
+def _as_bytes(value):
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def from_slots(slots):
+    """Build a bitmap with the given slots set."""
+    value = 0
+    for slot in slots:
+        value |= 1 << slot
+    return _as_bytes(value)
+
+
+def to_slots(bitmap):
+    """Return the sorted slots set in ``bitmap``."""
+    value = _as_int(bitmap)
+    slots = []
+    while value:
+        low = value & -value
+        slots.append(low.bit_length() - 1)
+        value ^= low
+    return slots
+
+
+def add(bitmap, *slots):
+    """Return ``bitmap`` with ``slots`` set."""
+    return union(bitmap, from_slots(slots))
+
+
+def remove(bitmap, *slots):
+    """Return ``bitmap`` with ``slots`` cleared."""
+    return _as_bytes(_as_int(bitmap) & ~_as_int(from_slots(slots)))
+
+
+def contains(bitmap, slot):
+    """Whether ``slot`` is set in ``bitmap``."""
+    return slot is not None and bool(_as_int(bitmap) >> slot & 1)
+
+
+def union(*bitmaps):
+    value = 0
+    for bitmap in bitmaps:
+        value |= _as_int(bitmap)
+    return _as_bytes(value)
+
+
+def count(bitmap):
+    """Number of slots set in ``bitmap``."""
+    return _as_int(bitmap).bit_count()
@@ -0,0 +1,89 @@
+"""
+Versioned cache for the public course catalog.
+
+Every cached catalog response is keyed by the current catalog version. Saving
+or deleting catalog content bumps the version (see ``courses.signals``), which
+orphans all previously cached responses at once instead of deleting them key
+by key.
+
+The version must be shared by every process serving the API, so the catalog
+cache is only used with a shared cache backend (Redis via ``REDIS_URL``). With
+a per-process cache (LocMem, the default without ``REDIS_URL``) a bump made in
+one gunicorn worker would never reach the others, which would keep serving
+stale catalog responses; responses are then built on every request instead.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_configured():
+    """Whether the default cache is shared between processes (and so can carry invalidations)."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _fresh_version():
+    # Millisecond timestamps never collide with versions that were evicted
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it if needed."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _fresh_version(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response."""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(CATALOG_VERSION_KEY, version, None)
+        return version
+
+
+def catalog_cache_key(name, request):
+    """Build the cache key of a catalog response for ``request``."""
+    # The absolute URI covers the query string and the scheme/host baked
+    # into serialized file URLs.
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'catalog:{get_catalog_version()}:{name}:{digest}'
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET responses of a catalog view from the versioned cache.
+
+    Cached data must not depend on the requesting user.
+    """
+
+    catalog_cache_name = None
+
+    def get(self, request, *args, **kwargs):
+        if not shared_cache_configured():
+            return super().get(request, *args, **kwargs)
+        key = catalog_cache_key(self.catalog_cache_name, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, CATALOG_CACHE_TIMEOUT)
+        return response
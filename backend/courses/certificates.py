@@ -0,0 +1,167 @@
+"""
+Certificate PDF rendering.
+
+Rendering is CPU-bound, so it runs in worker processes (see
+``courses.tasks``) rather than in web workers. Everything that does not
+change between certificates -- the registered fonts and the sizes of the
+background and signature images -- is built once per process by
+``load_template`` and reused for every certificate that process renders.
+
+Arabic strings are shaped by ``courses.arabic``, which caches them per
+process, so a course title or coach name is shaped once per worker rather
+than once per certificate. Drawing Arabic needs an Arabic TTF font
+(``CERTIFICATE_FONT``); fonts are registered once per process. The built-in
+PDF fonts have no Arabic glyphs, so rendering Arabic without a TTF font
+raises ``MissingFontError`` instead of producing an unreadable certificate.
+
+This module must not touch the ORM: worker processes only receive plain
+data and return the PDF bytes.
+"""
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab import rl_config
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .arabic import RTL_CHARACTERS, shape
+
+
+PAGE_SIZE = (1200, 850)
+NAME_COLOR = (97 / 255, 122 / 255, 144 / 255)
+ACCENT_COLOR = (139 / 255, 77 / 255, 139 / 255)
+TEXT_COLOR = (85 / 255, 85 / 255, 85 / 255)
+BORDER_COLOR = (102 / 255, 126 / 255, 234 / 255)
+
+AWARD_TEXT = 'تُمنح هذه الشهادة تقديرًا لاجتهادها وإتمامها متطلبات البرنامج التدريبي بنجاح'
+
+_template = None
+
+TemplateImage = namedtuple('TemplateImage', 'path width height')
+
+
+class MissingFontError(Exception):
+    """Raised when text needs glyphs the template's fonts don't have."""
+
+
+class CertificateTemplate:
+    """Fonts and images shared by every certificate rendered in a process."""
+
+    def __init__(self, background=None, signature=None, font=None, bold_font=None):
+        self.font = register_font(font) if font and os.path.exists(font) else 'Helvetica'
+        self.bold_font = register_font(bold_font) if bold_font and os.path.exists(bold_font) else (
+            self.font if font else 'Helvetica-Bold'
+        )
+        self.background = _load_image(background)
+        self.signature = _load_image(signature)
+        self.config = (background, signature, font, bold_font)
+
+
+@lru_cache(maxsize=None)
+def register_font(path):
+    """Parse and register the TTF font at ``path`` once per process; returns its name."""
+    name = f'Certificate-{os.path.splitext(os.path.basename(path))[0]}'
+    if name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+def _load_image(path):
+    """
+    Size an image once. It is drawn by path: reportlab then names it after
+    the path instead of hashing the decoded pixels, and embeds JPEG data as is.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    width, height = ImageReader(path).getSize()
+    return TemplateImage(path, width, height)
+
+
+def load_template(background=None, signature=None, font=None, bold_font=None):
+    """Build this process' template, unless one with the same configuration exists."""
+    global _template
+    config = (background, signature, font, bold_font)
+    if _template is None or _template.config != config:
+        _template = CertificateTemplate(*config)
+    return _template
+
+
+def _text(font, text):
+    """``text`` ready to be drawn with ``font``."""
+    if font in pdfmetrics.standardFonts and RTL_CHARACTERS.search(text):
+        raise MissingFontError(f'{font} has no Arabic glyphs; set CERTIFICATE_FONT to an Arabic TTF font')
+    return shape(text)
+
+
+@contextmanager
+def _binary_streams():
+    """
+    Embed image data as binary while rendering: ASCII85 would re-encode the
+    background image in pure Python for every certificate and make the file
+    a quarter larger. reportlab only reads this from its global config, so it
+    is restored afterwards.
+    """
+    previous = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
+
+
+def render_certificate(data, template=None):
+    """
+    Render one certificate and return the PDF bytes.
+
+    ``data`` holds ``full_name``, ``course_title``, ``coach_name``,
+    ``issue_date`` (already formatted) and optionally ``verification_code``.
+    """
+    template = template or _template or load_template()
+    width, height = PAGE_SIZE
+    with _binary_streams():
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZE, pageCompression=1)
+        pdf.setTitle(f"{data['full_name']} - {data['course_title']}")
+
+        if template.background is not None:
+            bg_width = 1000
+            bg_height = bg_width * template.background.height / template.background.width
+            pdf.drawImage(template.background.path, (width - bg_width) / 2, (height - bg_height) / 2, bg_width, bg_height)
+        pdf.setStrokeColorRGB(*BORDER_COLOR)
+        pdf.setLineWidth(4)
+        pdf.roundRect(16, 16, width - 32, height - 32, 20)
+        pdf.roundRect(28, 28, width - 56, height - 56, 14)
+
+        pdf.setFillColorRGB(*NAME_COLOR)
+        pdf.setFont(template.bold_font, 45)
+        pdf.drawCentredString(width / 2, height - 370, _text(template.bold_font, data['full_name']))
+
+        pdf.setFillColorRGB(*ACCENT_COLOR)
+        pdf.setFont(template.font, 22)
+        pdf.drawCentredString(width / 2, height - 420, _text(template.font, AWARD_TEXT))
+        pdf.setFont(template.bold_font, 30)
+        pdf.drawCentredString(width / 2, height - 470, _text(template.bold_font, f"برنامج {data['course_title']}"))
+
+        pdf.setFillColorRGB(*TEXT_COLOR)
+        pdf.setFont(template.font, 25)
+        pdf.drawCentredString(width / 2, 135, data['issue_date'])
+        if data.get('coach_name'):
+            pdf.setFont(template.font, 22)
+            pdf.drawCentredString(width - 260, 135, _text(template.font, data['coach_name']))
+        if template.signature is not None:
+            sig_height = 70
+            sig_width = sig_height * template.signature.width / template.signature.height
+            pdf.drawImage(template.signature.path, width - 260 - sig_width / 2, 165, sig_width, sig_height, mask='auto')
+
+        if data.get('verification_code'):
+            pdf.setFont(template.font, 14)
+            pdf.drawString(60, 50, data['verification_code'])
+
+        pdf.showPage()
+        pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,34 @@
+"""
+System checks for the courses app.
+
+Certificates always carry Arabic text, which the built-in PDF fonts cannot
+draw, so rendering without an Arabic TTF font would fail every certificate.
+That is reported once at startup instead.
+"""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_certificate_font(app_configs, **kwargs):
+    if not getattr(settings, 'CERTIFICATE_RENDERING', True):
+        return []
+    errors = []
+    for setting in ('CERTIFICATE_FONT', 'CERTIFICATE_BOLD_FONT'):
+        path = getattr(settings, setting, '')
+        if setting == 'CERTIFICATE_FONT' and not path:
+            errors.append(Error(
+                'CERTIFICATE_FONT is not set; certificates need an Arabic TTF font.',
+                hint='Point CERTIFICATE_FONT at an Arabic TTF font such as Amiri, '
+                     'or set CERTIFICATE_RENDERING=False to leave certificates pending.',
+                id='courses.E001',
+            ))
+        elif path and not os.path.isfile(path):
+            errors.append(Error(
+                f'{setting} points to a missing file: {path}',
+                hint='Use the path of an Arabic TTF font readable by the web and render workers.',
+                id='courses.E002',
+            ))
+    return errors
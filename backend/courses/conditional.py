@@ -0,0 +1,68 @@
+"""
+Conditional GET (ETag / Last-Modified) support for read-only endpoints.
+
+Views describe the state their response depends on with one cheap aggregate
+query. The validators are derived from that state alone, so an unchanged
+resource is answered with ``304 Not Modified`` before anything is serialized.
+
+``Last-Modified`` is only sent when the state consists of timestamps alone.
+A state that also holds counts or versions changes without any timestamp
+moving (e.g. a row is deleted), so clients revalidating with
+``If-Modified-Since`` alone would get stale 304s; those views rely on the
+ETag only.
+"""
+import hashlib
+from datetime import datetime
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Add ETag/Last-Modified validators to a GET endpoint."""
+
+    # Set on views whose response differs per authenticated user
+    conditional_vary_on_user = False
+
+    def get_conditional_state(self):
+        """
+        Return a dict describing the state the response is built from, or
+        ``None`` to skip conditional handling (e.g. the object is missing).
+        """
+        raise NotImplementedError
+
+    def get_validators(self, request):
+        state = self.get_conditional_state()
+        if state is None:
+            return None, None
+
+        parts = [request.get_full_path(), sorted(state.items())]
+        if self.conditional_vary_on_user:
+            parts.append(request.user.pk)
+        etag = quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+        last_modified = None
+        timestamps = [value for value in state.values() if value is not None]
+        if timestamps and all(isinstance(value, datetime) for value in timestamps):
+            last_modified = int(max(timestamps).timestamp())
+        return etag, last_modified
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.conditional_vary_on_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
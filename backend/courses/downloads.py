@@ -0,0 +1,172 @@
+"""
+File downloads behind permission checks.
+
+Files on local storage are served with ``FileResponse`` (the WSGI server's
+``sendfile`` when available) and support conditional requests
+(ETag/Last-Modified), single byte ``Range`` requests with ``206 Partial
+Content`` and ``If-Range``, so interrupted downloads of large course PDFs
+resume instead of restarting. Ranges are streamed in chunks; no file is
+read into memory.
+
+Files on Cloudinary are answered with a redirect to a signed download URL
+that expires after ``DOWNLOAD_URL_MAX_AGE`` seconds, so only users who
+passed the permission check get a working link, and not for long.
+Cloudinary handles ranges itself, and proxying the bytes through a web
+worker would only add latency (its storage backend reads whole files into
+memory). The permanent storage URLs of protected files must not be
+exposed; serializers link to files with ``download_url``.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import time
+
+import cloudinary.utils
+from cloudinary_storage.storage import MediaCloudinaryStorage
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _download_max_age():
+    return getattr(settings, 'DOWNLOAD_MAX_AGE', 3600)
+
+
+def _download_url_max_age():
+    return getattr(settings, 'DOWNLOAD_URL_MAX_AGE', 15 * 60)
+
+
+def signed_url(field_file, attachment=False):
+    """A URL to a file on Cloudinary that expires shortly; ``None`` for other storages."""
+    storage = field_file.storage
+    if not isinstance(storage, MediaCloudinaryStorage):
+        return None
+    return cloudinary.utils.private_download_url(
+        field_file.name, '',
+        resource_type=storage.RESOURCE_TYPE,
+        type='upload',
+        expires_at=int(time.time()) + _download_url_max_age(),
+        attachment=attachment,
+    )
+
+
+def download_url(request, field_file, endpoint_url):
+    """
+    Where the (already authorized) requester downloads ``field_file``: a
+    signed Cloudinary URL, or ``endpoint_url`` (the permission-checked
+    download view) for other storages.
+    """
+    return signed_url(field_file) or request.build_absolute_uri(endpoint_url)
+
+
+def _local_path(field_file):
+    try:
+        return field_file.path
+    except NotImplementedError:
+        return None
+
+
+def _parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single byte range, ``None`` to
+    send the whole file, or ``False`` when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or (not match.group(1) and not match.group(2)):
+        # Malformed or multiple ranges: answer with the whole file
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _stream_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request, field_file, filename=None, content_type=None):
+    """
+    Respond with ``field_file``: streamed with Range/conditional support when
+    local, redirected to a signed URL when on Cloudinary.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    url = signed_url(field_file, attachment=True)
+    if url is not None:
+        response = HttpResponseRedirect(url)
+        # The signed URL expires; every download asks for a fresh one
+        add_never_cache_headers(response)
+        return response
+    path = _local_path(field_file)
+    if path is None:
+        return FileResponse(field_file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
+
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+    stat = os.fstat(file.fileno())
+    size, last_modified = stat.st_size, int(stat.st_mtime)
+    etag = quote_etag(hashlib.sha1(f'{field_file.name}:{size}:{stat.st_mtime_ns}'.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        file.close()
+    else:
+        byte_range = None
+        if request.method == 'GET' and 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, last_modified):
+            byte_range = _parse_range(request.META['HTTP_RANGE'], size)
+
+        if byte_range is False:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _stream_range(file, start, end - start + 1),
+                status=206,
+                content_type=content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+        else:
+            response = FileResponse(file, as_attachment=True, filename=filename, content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=_download_max_age())
+    return response
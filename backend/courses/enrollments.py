@@ -0,0 +1,167 @@
+"""
+Bulk enrollment import for admins.
+
+Rows are ``{'email' or 'user_id', 'course_id'}`` dicts (from JSON or CSV).
+Users, courses and existing enrollments are resolved with one batched
+lookup each, enrollments are written with one ``bulk_create`` (or one
+delete), and every input row gets an entry in the returned report.
+"""
+import csv
+import io
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Course, Enrollment
+from .signals import batched_enrollment_signals
+from .upsert import bulk_insert_or_ignore
+
+
+User = get_user_model()
+
+USER_NOT_FOUND = 'المستخدم غير موجود'
+USER_IS_STAFF = 'لا يمكن تعيين دورات للمسؤولين'
+COURSE_NOT_FOUND = 'الدورة غير موجودة'
+INVALID_ROW = 'يجب تحديد المستخدم (email أو user_id) و course_id'
+
+
+def parse_csv_rows(text):
+    """Read rows from CSV text with an ``email`` and/or ``user_id`` column and a ``course_id`` column."""
+    return [
+        {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+
+def _as_id(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def resolve_rows(rows):
+    """
+    Resolve users and courses of ``rows`` in batched lookups.
+
+    Returns ``(resolved, report)``: ``resolved`` holds ``(index, user_id,
+    course_id)`` for valid rows, ``report`` one entry per row with errors
+    already filled in.
+    """
+    parsed = []
+    for row in rows:
+        row = row if isinstance(row, dict) else {}
+        email = str(row.get('email') or '').strip().lower()
+        parsed.append((_as_id(row.get('user_id')), email, _as_id(row.get('course_id'))))
+
+    user_ids = {user_id for user_id, _, _ in parsed if user_id}
+    emails = {email for user_id, email, _ in parsed if not user_id and email}
+    users = User.objects.annotate(email_lower=Lower('email')).filter(
+        Q(pk__in=user_ids) | Q(email_lower__in=emails)
+    ).values_list('pk', 'email_lower', 'is_staff')
+    by_id, by_email = {}, {}
+    for pk, email, is_staff in users:
+        by_id[pk] = is_staff
+        by_email[email] = pk
+    course_ids = set(Course.objects.filter(
+        pk__in={course_id for _, _, course_id in parsed if course_id}
+    ).values_list('pk', flat=True))
+
+    resolved, report = [], []
+    for index, (user_id, email, course_id) in enumerate(parsed):
+        user_id = user_id or by_email.get(email)
+        entry = {'row': index, 'user_id': user_id, 'course_id': course_id, 'status': 'error'}
+        report.append(entry)
+        if course_id is None or (user_id is None and not email):
+            entry['error'] = INVALID_ROW
+        elif user_id not in by_id:
+            entry['error'] = USER_NOT_FOUND
+        elif by_id[user_id]:
+            entry['error'] = USER_IS_STAFF
+        elif course_id not in course_ids:
+            entry['error'] = COURSE_NOT_FOUND
+        else:
+            resolved.append((index, user_id, course_id))
+    return resolved, report
+
+
+def _existing_pairs(pairs):
+    if not pairs:
+        return set()
+    return set(Enrollment.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        course_id__in={course_id for _, course_id in pairs},
+    ).values_list('user_id', 'course_id'))
+
+
+def bulk_assign(rows, batch_size=1000):
+    """Enroll each row's user in its course. Returns the per-row report."""
+    resolved, report = resolve_rows(rows)
+    existing = _existing_pairs({(user_id, course_id) for _, user_id, course_id in resolved})
+
+    new_pairs = set()
+    for index, user_id, course_id in resolved:
+        pair = (user_id, course_id)
+        if pair in existing:
+            report[index]['status'] = 'already_enrolled'
+        elif pair in new_pairs:
+            report[index]['status'] = 'duplicate'
+        else:
+            report[index]['status'] = 'enrolled'
+            new_pairs.add(pair)
+
+    with transaction.atomic(), batched_enrollment_signals() as batch:
+        # The unique (user, course) constraint absorbs enrollments made concurrently
+        inserted = {
+            (enrollment.user_id, enrollment.course_id)
+            for enrollment in bulk_insert_or_ignore(
+                Enrollment, ('user', 'course'),
+                [Enrollment(user_id=user_id, course_id=course_id) for user_id, course_id in new_pairs],
+                batch_size=batch_size,
+            )
+        }
+        for user_id, course_id in inserted:
+            batch.add(user_id, course_id, 1)
+    for index, user_id, course_id in resolved:
+        if report[index]['status'] == 'enrolled' and (user_id, course_id) not in inserted:
+            report[index]['status'] = 'already_enrolled'
+    return report
+
+
+def bulk_unassign(rows):
+    """Remove each row's user from its course. Returns the per-row report."""
+    resolved, report = resolve_rows(rows)
+    existing = _existing_pairs({(user_id, course_id) for _, user_id, course_id in resolved})
+
+    removed = set()
+    for index, user_id, course_id in resolved:
+        pair = (user_id, course_id)
+        if pair in removed:
+            report[index]['status'] = 'duplicate'
+        elif pair in existing:
+            report[index]['status'] = 'unenrolled'
+            removed.add(pair)
+        else:
+            report[index]['status'] = 'not_enrolled'
+
+    if removed:
+        users_by_course = {}
+        for user_id, course_id in removed:
+            users_by_course.setdefault(course_id, set()).add(user_id)
+        condition = Q()
+        for course_id, user_ids in users_by_course.items():
+            condition |= Q(course_id=course_id, user_id__in=user_ids)
+        with transaction.atomic(), batched_enrollment_signals():
+            Enrollment.objects.filter(condition).delete()
+    return report
+
+
+def summarize(report):
+    """Count report entries per status."""
+    summary = {}
+    for entry in report:
+        summary[entry['status']] = summary.get(entry['status'], 0) + 1
+    return summary
@@ -0,0 +1,65 @@
+"""
+Bulk certificate issuance for course completers.
+
+Completed enrollments without a certificate are found in one query, their
+certificates are inserted with one ``INSERT ... ON CONFLICT DO NOTHING``
+(which returns exactly the rows it created) and the PDFs are then rendered
+in chunks on the certificate render pool (see ``courses.tasks``).
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Certificate, Enrollment, StatCounter
+from .progress import flush_watch_buffer, write_behind_enabled
+from .upsert import bulk_insert_or_ignore
+
+
+def completed_without_certificate(course_ids=None):
+    """Enrollments at 100% progress whose user has no certificate for the course yet."""
+    enrollments = Enrollment.objects.filter(progress__gte=100).exclude(Exists(
+        Certificate.objects.filter(user_id=OuterRef('user_id'), course_id=OuterRef('course_id'))
+    ))
+    if course_ids:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+    return enrollments
+
+
+def _full_name(first_name, last_name, email):
+    return f'{first_name} {last_name}'.strip() or email
+
+
+def issue_certificates(course_ids=None, coach_name=None, batch_size=1000):
+    """
+    Create pending certificates for every completer of ``course_ids`` (default:
+    all courses). Returns the ids of the created certificates, which still
+    need rendering.
+    """
+    if course_ids and write_behind_enabled():
+        # Buffered watch events may complete enrollments; issuing for all
+        # courses leaves the buffer to the scheduled flusher
+        flush_watch_buffer(course_ids=course_ids)
+
+    completers = list(completed_without_certificate(course_ids).values_list(
+        'user_id', 'course_id', 'user__first_name', 'user__last_name', 'user__email',
+    ))
+    if not completers:
+        return []
+
+    with transaction.atomic():
+        # Certificates learners request meanwhile win; theirs are rendered by the signal
+        certificates = bulk_insert_or_ignore(
+            Certificate, ('user', 'course'),
+            [
+                Certificate(
+                    user_id=user_id,
+                    course_id=course_id,
+                    full_name=_full_name(first_name, last_name, email),
+                    coach_name=coach_name,
+                )
+                for user_id, course_id, first_name, last_name, email in completers
+            ],
+            batch_size=batch_size,
+        )
+        # Inserted without signals
+        StatCounter.objects.adjust(total_certificates=len(certificates))
+    return sorted(certificate.pk for certificate in certificates)
@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import arabic, certificates
+from courses.tasks import certificate_template_config, create_render_pool
+
+
+SAMPLE_NAMES = ['نور الهدى محمد', 'فاطمة الزهراء علي', 'Sara Ahmed', 'مريم عبد الرحمن', 'ليلى حسن']
+
+
+def _sample(index, course_title, coach_name):
+    return {
+        'full_name': f'{SAMPLE_NAMES[index % len(SAMPLE_NAMES)]} {index}',
+        'course_title': course_title,
+        'coach_name': coach_name,
+        'issue_date': '2025/01/01',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure certificate rendering throughput (certificates per second per core) with the configured template.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Certificates rendered per measurement.')
+        parser.add_argument('--workers', type=int, default=0, help='Also measure a process pool of this many workers.')
+        parser.add_argument('--course-title', default='التغذية العلاجية')
+        parser.add_argument('--coach-name', default='د. بسمة')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        samples = [_sample(i, options['course_title'], options['coach_name']) for i in range(count)]
+        if not arabic.shaping_available():
+            self.stdout.write(self.style.WARNING('arabic_reshaper/python-bidi not installed: text is not shaped.'))
+
+        started = time.perf_counter()
+        template = certificates.load_template(*certificate_template_config())
+        self.stdout.write(f'template build: {(time.perf_counter() - started) * 1000:.1f} ms')
+        try:
+            certificates.render_certificate(samples[0], template)
+        except certificates.MissingFontError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        for data in samples:
+            arabic.shape.cache_clear()
+            certificates.render_certificate(data, template)
+        cold = count / (time.perf_counter() - started)
+
+        arabic.shape.cache_clear()
+        started = time.perf_counter()
+        sizes = [len(certificates.render_certificate(data, template)) for data in samples]
+        warm = count / (time.perf_counter() - started)
+        self.stdout.write(f'1 core, shaping uncached: {cold:.1f} certificates/s')
+        self.stdout.write(f'1 core, shaping cached:   {warm:.1f} certificates/s ({arabic.shape.cache_info().hits} cache hits)')
+        self.stdout.write(f'average PDF size: {sum(sizes) / count / 1024:.0f} KiB')
+
+        workers = options['workers']
+        if workers:
+            with create_render_pool(workers) as pool:
+                # Warm up: start the processes and build their templates
+                list(pool.map(certificates.render_certificate, samples[:workers]))
+                started = time.perf_counter()
+                list(pool.map(certificates.render_certificate, samples, chunksize=max(1, count // (workers * 4))))
+                rate = count / (time.perf_counter() - started)
+            cores = min(workers, os.cpu_count() or 1)
+            self.stdout.write(f'{workers} processes on {cores} cores: {rate:.1f} certificates/s ({rate / cores:.1f} per core)')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.analytics import build_rollups, metric_sources, reset_rollups
+
+
+class Command(BaseCommand):
+    help = 'Count new users, enrollments, watches, certificates and feedback into the daily/weekly analytics rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', action='append', dest='metrics', help='Only build this metric (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument('--rebuild', action='store_true', help='Drop the existing rollups and recount from scratch.')
+
+    def handle(self, *args, **options):
+        metrics = options['metrics']
+        unknown = set(metrics or ()) - set(metric_sources())
+        if unknown:
+            raise CommandError(f"Unknown metric(s): {', '.join(sorted(unknown))}")
+        if options['rebuild']:
+            reset_rollups(metrics)
+        processed = build_rollups(metrics, batch_size=options['batch_size'])
+        for metric, count in processed.items():
+            self.stdout.write(f'{metric}: {count} new rows')
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {sum(processed.values())} rows.'))
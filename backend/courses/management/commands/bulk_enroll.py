@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.enrollments import bulk_assign, bulk_unassign, parse_csv_rows, summarize
+
+
+class Command(BaseCommand):
+    help = 'Enroll (or with --unassign, unenroll) users from a CSV or JSON file of (email|user_id, course_id) rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with email/user_id and course_id columns, or a JSON list of rows.')
+        parser.add_argument('--unassign', action='store_true', help='Remove the enrollments instead of creating them.')
+        parser.add_argument('--report', help='Write the per-row report to this JSON file.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig') as f:
+                text = f.read()
+        except OSError as exc:
+            raise CommandError(exc)
+
+        if options['path'].endswith('.json'):
+            try:
+                rows = json.loads(text)
+            except ValueError as exc:
+                raise CommandError(f'Invalid JSON: {exc}')
+        else:
+            rows = parse_csv_rows(text)
+
+        report = (bulk_unassign if options['unassign'] else bulk_assign)(rows)
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        for entry in report:
+            if entry['status'] == 'error':
+                self.stderr.write(f"Row {entry['row']}: {entry['error']}")
+        summary = ', '.join(f'{status}: {count}' for status, count in sorted(summarize(report).items()))
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(report)} rows ({summary}).'))
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from courses.progress import flush_watch_buffer
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered watch events (PROGRESS_WRITE_BEHIND) to watched videos and enrollment progress.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every --interval seconds.')
+        parser.add_argument(
+            '--interval', type=float, default=settings.PROGRESS_FLUSH_INTERVAL,
+            help='Seconds between flushes in --loop mode.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Events applied per transaction.')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_watch_buffer(batch_size=options['batch_size'])
+            if flushed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} watch events.'))
+            if not options['loop']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
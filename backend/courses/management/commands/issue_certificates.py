@@ -0,0 +1,45 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.issuance import issue_certificates
+from courses.progress import flush_watch_buffer, write_behind_enabled
+from courses.tasks import create_render_pool, render_certificates
+
+
+class Command(BaseCommand):
+    help = 'Issue certificates to every learner who completed a course and render them on all CPU cores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', help='Only this course id (repeatable).')
+        parser.add_argument('--coach-name', help='Coach name printed on the new certificates.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Render processes (default: CPU count).')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Certificates rendered per chunk.')
+        parser.add_argument('--no-render', action='store_true', help='Only create the certificates; render_pending_certificates renders them later.')
+
+    def handle(self, *args, **options):
+        if not options['course'] and write_behind_enabled():
+            # Buffered watch events may complete enrollments in any course
+            flush_watch_buffer()
+        certificate_ids = issue_certificates(options['course'], coach_name=options['coach_name'])
+        self.stdout.write(f'Issued {len(certificate_ids)} certificates.')
+        if options['no_render'] or not certificate_ids:
+            return
+
+        started = time.monotonic()
+        ready = failed = 0
+        chunk_size = options['chunk_size']
+        with create_render_pool(options['workers']) as pool:
+            for start in range(0, len(certificate_ids), chunk_size):
+                results = render_certificates(certificate_ids[start:start + chunk_size], pool=pool)
+                ready += results['ready']
+                failed += results['failed']
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{ready + failed}/{len(certificate_ids)} rendered '
+                    f'({failed} failed, {(ready + failed) / elapsed:.1f}/s)'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'{ready} ready, {failed} failed in {time.monotonic() - started:.2f}s.'
+        ))
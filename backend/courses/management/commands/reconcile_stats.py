@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from courses.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount the admin dashboard totals from the tables and correct any drift.'
+
+    def handle(self, *args, **options):
+        stats, drift = reconcile_stats()
+        for name, correction in sorted(drift.items()):
+            self.stdout.write(f'{name}: {stats[name] - correction} -> {stats[name]} ({correction:+d})')
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(stats)} totals, {len(drift)} corrected.'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course, Video, parse_duration_seconds
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-course counters from the content tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', help='Only recount this course id (repeatable).')
+        parser.add_argument(
+            '--durations', action='store_true',
+            help='Also re-parse Video.duration_seconds from the duration strings.',
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course']:
+            courses = courses.filter(pk__in=options['course'])
+
+        if options['durations']:
+            videos = list(Video.objects.filter(course__in=courses).only('duration', 'duration_seconds'))
+            changed = [v for v in videos if v.duration_seconds != parse_duration_seconds(v.duration)]
+            for video in changed:
+                video.duration_seconds = parse_duration_seconds(video.duration)
+            Video.objects.bulk_update(changed, ['duration_seconds'], batch_size=1000)
+            self.stdout.write(f'Fixed {len(changed)} video durations.')
+
+        updated = courses.recount_stats()
+        self.stdout.write(self.style.SUCCESS(f'Recounted stats for {updated} courses.'))
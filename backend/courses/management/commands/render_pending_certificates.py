@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from courses.models import Certificate
+from courses.tasks import render_certificates
+
+
+class Command(BaseCommand):
+    help = 'Render the PDFs of certificates still pending (e.g. after a restart) on the render process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also render certificates whose rendering failed.')
+        parser.add_argument('--min-age', type=int, default=300,
+                            help='Skip certificates issued less than this many seconds ago (the web workers render those).')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        statuses = [Certificate.STATUS_PENDING]
+        if options['retry_failed']:
+            statuses.append(Certificate.STATUS_FAILED)
+        certificate_ids = list(Certificate.objects.filter(
+            status__in=statuses,
+            issue_date__lte=timezone.now() - timedelta(seconds=options['min_age']),
+        ).order_by('pk').values_list('pk', flat=True))
+
+        started = time.monotonic()
+        totals = {Certificate.STATUS_READY: 0, Certificate.STATUS_FAILED: 0}
+        batch_size = options['batch_size']
+        for start in range(0, len(certificate_ids), batch_size):
+            results = render_certificates(certificate_ids[start:start + batch_size], use_pool=True)
+            for status, count in results.items():
+                totals[status] += count
+            self.stdout.write(f'{min(start + batch_size, len(certificate_ids))}/{len(certificate_ids)} rendered')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals[Certificate.STATUS_READY]} ready, {totals[Certificate.STATUS_FAILED]} failed in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,56 @@
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from courses.cache import shared_cache_configured
+from courses.models import Course
+from courses.views import CategoryListView, CourseListView, CourseDetailView, FreeVideoListView
+
+
+class Command(BaseCommand):
+    help = 'Pre-populate the public catalog cache (run after deploys).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            required=True,
+            help='Public base URL the API is served from, e.g. https://api.example.com; it is part of the cache key.',
+        )
+
+    def handle(self, *args, **options):
+        if not shared_cache_configured():
+            raise CommandError(
+                'The catalog cache needs a shared cache backend (set REDIS_URL); '
+                'a per-process cache warmed here is never read by the web workers.'
+            )
+        base_url = urlsplit(options['base_url'])
+        if base_url.scheme not in ('http', 'https') or not base_url.hostname:
+            raise CommandError('--base-url must be an absolute http(s) URL.')
+        self.factory = APIRequestFactory(
+            SERVER_NAME=base_url.hostname,
+            SERVER_PORT=str(base_url.port or (443 if base_url.scheme == 'https' else 80)),
+        )
+        self.secure = base_url.scheme == 'https'
+
+        warmed = self.warm_pages(CategoryListView, '/api/categories/')
+        warmed += self.warm_pages(CourseListView, '/api/courses/')
+        warmed += self.warm_pages(FreeVideoListView, '/api/videos/free/')
+        for pk in Course.objects.filter(is_published=True).values_list('pk', flat=True):
+            self.get(CourseDetailView, f'/api/courses/{pk}/', pk=pk)
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} catalog responses.'))
+
+    def get(self, view_class, path, params=None, **kwargs):
+        request = self.factory.get(path, params, secure=self.secure)
+        return view_class.as_view()(request, **kwargs)
+
+    def warm_pages(self, view_class, path):
+        """Request every page of a paginated list view."""
+        page = 1
+        while True:
+            response = self.get(view_class, path, {'page': page} if page > 1 else None)
+            if response.status_code != 200 or not response.data.get('next'):
+                return page
+            page += 1
@@ -0,0 +1,80 @@
+import re
+
+from django.db import migrations
+
+
+# Frozen copy of the courses.search normalization and index structures as of
+# this migration; later changes to that module must not change what it does.
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06dc\u06df-\u06e8\u06ea-\u06ed]')
+TATWEEL = '\u0640'
+ARABIC_LETTER_FORMS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+TOKEN_RE = re.compile(r'\w+')
+DEFINITE_ARTICLE = 'ال'
+SEARCH_CONFIG = 'simple'
+
+COURSE_TABLE = 'courses_course'
+FTS_TABLE = 'courses_course_fts'
+GIN_INDEX = 'courses_course_search_vector_gin'
+
+
+def search_document(title, description):
+    text = ARABIC_DIACRITICS.sub('', f'{title} {description}').replace(TATWEEL, '')
+    terms = []
+    for token in TOKEN_RE.findall(text.translate(ARABIC_LETTER_FORMS).casefold()):
+        if token.startswith(DEFINITE_ARTICLE) and len(token) > len(DEFINITE_ARTICLE) + 1:
+            token = token[len(DEFINITE_ARTICLE):]
+        terms.append(token)
+    return ' '.join(terms)
+
+
+def create_search_index(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE {quote(COURSE_TABLE)} ADD COLUMN search_vector tsvector')
+        schema_editor.execute(f'CREATE INDEX {quote(GIN_INDEX)} ON {quote(COURSE_TABLE)} USING GIN (search_vector)')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f"CREATE VIRTUAL TABLE {quote(FTS_TABLE)} USING fts5(document, tokenize = 'unicode61')")
+    else:
+        return
+
+    documents = [
+        (pk, search_document(title, description))
+        for pk, title, description in Course.objects.using(connection.alias).values_list('pk', 'title', 'description')
+    ]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                f'UPDATE {quote(COURSE_TABLE)} SET search_vector = to_tsvector(%s, %s) WHERE id = %s',
+                [(SEARCH_CONFIG, document, pk) for pk, document in documents],
+            )
+        else:
+            cursor.executemany(f'INSERT INTO {quote(FTS_TABLE)} (rowid, document) VALUES (%s, %s)', documents)
+
+
+def drop_search_index(apps, schema_editor):
+    quote = schema_editor.quote_name
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {quote(GIN_INDEX)}')
+        schema_editor.execute(f'ALTER TABLE {quote(COURSE_TABLE)} DROP COLUMN IF EXISTS search_vector')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {quote(FTS_TABLE)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_contactmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
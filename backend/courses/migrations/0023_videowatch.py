@@ -0,0 +1,84 @@
+import json
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def parse_watched_ids(value):
+    """Normalise the legacy JSON list (which was occasionally stored as a string)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else []
+        except ValueError:
+            value = []
+    if not isinstance(value, list):
+        return set()
+    return {int(v) for v in value if str(v).isdigit()}
+
+
+def copy_watched_ids_to_rows(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Video = apps.get_model('courses', 'Video')
+    VideoWatch = apps.get_model('courses', 'VideoWatch')
+    db = schema_editor.connection.alias
+
+    course_videos = {}
+    for video_id, course_id in Video.objects.using(db).values_list('id', 'course_id'):
+        course_videos.setdefault(course_id, set()).add(video_id)
+
+    # When the videos were first watched is unknown; counting them all on the
+    # day of the migration would skew the "videos watched" analytics
+    now = django.utils.timezone.now()
+    watches = []
+    enrollments = Enrollment.objects.using(db).values_list('id', 'course_id', 'watched_video_ids')
+    for enrollment_id, course_id, watched_ids in enrollments.iterator():
+        # Drop IDs of videos that were deleted or belong to another course
+        for video_id in parse_watched_ids(watched_ids) & course_videos.get(course_id, set()):
+            watches.append(VideoWatch(
+                enrollment_id=enrollment_id, video_id=video_id, first_watched_at=None, last_watched_at=now,
+            ))
+    VideoWatch.objects.using(db).bulk_create(watches, batch_size=1000, ignore_conflicts=True)
+
+
+def copy_rows_to_watched_ids(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    VideoWatch = apps.get_model('courses', 'VideoWatch')
+    db = schema_editor.connection.alias
+
+    watched = {}
+    for enrollment_id, video_id in VideoWatch.objects.using(db).values_list('enrollment_id', 'video_id'):
+        watched.setdefault(enrollment_id, []).append(video_id)
+    enrollments = list(Enrollment.objects.using(db).filter(id__in=watched))
+    for enrollment in enrollments:
+        enrollment.watched_video_ids = sorted(watched[enrollment.id])
+    Enrollment.objects.using(db).bulk_update(enrollments, ['watched_video_ids'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0022_updated_at_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoWatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_watched_at', models.DateTimeField(default=django.utils.timezone.now, null=True)),
+                ('last_watched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_watches', to='courses.enrollment')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watches', to='courses.video')),
+            ],
+            options={
+                'ordering': ['enrollment', 'video'],
+                'unique_together': {('enrollment', 'video')},
+            },
+        ),
+        migrations.RunPython(copy_watched_ids_to_rows, copy_rows_to_watched_ids),
+        migrations.RemoveField(
+            model_name='enrollment',
+            name='watched_video_ids',
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def parse_duration_seconds(value):
+    """Parse a 'mm:ss' or 'h:mm:ss' duration (a bare number means minutes); frozen copy of the model helper."""
+    parts = (value or '').strip().split(':')
+    if not all(part.strip().isdigit() for part in parts):
+        return 0
+    if len(parts) == 1:
+        return int(parts[0]) * 60
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Video = apps.get_model('courses', 'Video')
+    PDF = apps.get_model('courses', 'PDF')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    db = schema_editor.connection.alias
+
+    videos = list(Video.objects.using(db).only('duration'))
+    for video in videos:
+        video.duration_seconds = parse_duration_seconds(video.duration)
+    Video.objects.using(db).bulk_update(videos, ['duration_seconds'], batch_size=1000)
+
+    def subquery(model, aggregate):
+        rows = model.objects.filter(course=OuterRef('pk')).order_by().values('course')
+        return Coalesce(Subquery(rows.annotate(value=aggregate).values('value')), 0)
+
+    Course.objects.using(db).update(
+        video_count=subquery(Video, Count('pk')),
+        pdf_count=subquery(PDF, Count('pk')),
+        enrollment_count=subquery(Enrollment, Count('pk')),
+        total_duration_seconds=subquery(Video, Sum('duration_seconds')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0023_videowatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='pdf_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_duration_seconds',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
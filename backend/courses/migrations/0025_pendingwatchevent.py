@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0024_course_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingWatchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watched', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_watch_events', to='courses.enrollment')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.video')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
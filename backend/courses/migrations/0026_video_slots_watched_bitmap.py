@@ -0,0 +1,70 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+def bitmap_from_slots(slots):
+    """Little-endian bitmap with the given slots set; frozen copy of courses.bitset.from_slots."""
+    value = 0
+    for slot in slots:
+        value |= 1 << slot
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def assign_slots(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Video = apps.get_model('courses', 'Video')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    VideoWatch = apps.get_model('courses', 'VideoWatch')
+    db = schema_editor.connection.alias
+
+    # Number existing videos in their current playlist order
+    next_slots = {}
+    videos = list(Video.objects.using(db).exclude(course=None).order_by('course_id', 'order', 'created_at', 'id'))
+    for video in videos:
+        video.slot = next_slots.get(video.course_id, 0)
+        next_slots[video.course_id] = video.slot + 1
+    Video.objects.using(db).bulk_update(videos, ['slot'], batch_size=1000)
+
+    courses = list(Course.objects.using(db).filter(pk__in=next_slots))
+    for course in courses:
+        course.next_video_slot = next_slots[course.pk]
+    Course.objects.using(db).bulk_update(courses, ['next_video_slot'], batch_size=1000)
+
+    slots = {}
+    for enrollment_id, slot in VideoWatch.objects.using(db).values_list('enrollment_id', 'video__slot'):
+        slots.setdefault(enrollment_id, []).append(slot)
+    enrollments = list(Enrollment.objects.using(db).filter(pk__in=slots).only('id'))
+    for enrollment in enrollments:
+        enrollment.watched_bitmap = bitmap_from_slots(slots[enrollment.pk])
+    Enrollment.objects.using(db).bulk_update(enrollments, ['watched_bitmap'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0025_pendingwatchevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='next_video_slot',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='watched_bitmap',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='slot',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(assign_slots, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='video',
+            unique_together={('course', 'slot')},
+        ),
+    ]
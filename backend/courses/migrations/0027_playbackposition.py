@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0026_video_slots_watched_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaybackPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position_seconds', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playback_positions', to='courses.enrollment')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.video')),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'unique_together': {('enrollment', 'video')},
+            },
+        ),
+    ]
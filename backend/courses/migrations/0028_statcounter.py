@@ -0,0 +1,45 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:43
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Course = apps.get_model('courses', 'Course')
+    counts = {
+        'total_courses': Course.objects.using(db).count(),
+        'published_courses': Course.objects.using(db).filter(is_published=True).count(),
+        'total_videos': apps.get_model('courses', 'Video').objects.using(db).count(),
+        'total_users': apps.get_model(settings.AUTH_USER_MODEL).objects.using(db).count(),
+        'total_enrollments': apps.get_model('courses', 'Enrollment').objects.using(db).count(),
+        'total_pdfs': apps.get_model('courses', 'PDF').objects.using(db).count(),
+        'total_certificates': apps.get_model('courses', 'Certificate').objects.using(db).count(),
+    }
+    StatCounter = apps.get_model('courses', 'StatCounter')
+    StatCounter.objects.using(db).bulk_create([StatCounter(name=name, value=value) for name, value in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0027_playbackposition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
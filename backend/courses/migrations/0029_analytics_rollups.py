@@ -0,0 +1,46 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0028_statcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=30, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField(help_text='The day, or the Monday of the week')),
+                ('metric', models.CharField(choices=[('new_users', 'New users'), ('new_enrollments', 'New enrollments'), ('videos_watched', 'Videos watched'), ('certificates_issued', 'Certificates issued'), ('feedback', 'Feedback')], max_length=30)),
+                ('value', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course')),
+            ],
+            options={
+                'ordering': ['period', 'metric', 'period_start'],
+                'indexes': [models.Index(fields=['metric', 'period', 'course', 'period_start'], name='courses_ana_metric_182346_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='analyticsrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('course__isnull', False)), fields=('period', 'period_start', 'metric', 'course'), name='unique_course_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='analyticsrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('period', 'period_start', 'metric'), name='unique_overall_rollup'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 15:47
+
+import cloudinary_storage.storage
+from django.db import migrations, models
+
+
+def mark_rendered(apps, schema_editor):
+    Certificate = apps.get_model('courses', 'Certificate')
+    Certificate.objects.using(schema_editor.connection.alias).exclude(pdf__isnull=True).exclude(pdf='').update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0029_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', help_text='Rendering state of the PDF', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='pdf',
+            field=models.FileField(blank=True, null=True, storage=cloudinary_storage.storage.RawMediaCloudinaryStorage(), upload_to='certificates/'),
+        ),
+        migrations.RunPython(mark_rendered, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+import courses.models
+
+
+def assign_codes(apps, schema_editor):
+    Certificate = apps.get_model('courses', 'Certificate')
+    db = schema_editor.connection.alias
+    certificates = list(Certificate.objects.using(db).filter(verification_code__isnull=True).only('pk'))
+    codes = set()
+    for certificate in certificates:
+        code = courses.models.generate_verification_code()
+        while code in codes:
+            code = courses.models.generate_verification_code()
+        codes.add(code)
+        certificate.verification_code = code
+    Certificate.objects.using(db).bulk_update(certificates, ['verification_code'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0030_certificate_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='verification_code',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(assign_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='certificate',
+            name='verification_code',
+            field=models.CharField(default=courses.models.generate_verification_code, editable=False, help_text='Public code third parties use to verify the certificate', max_length=12, unique=True),
+        ),
+    ]
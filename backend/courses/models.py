@@ -1,17 +1,36 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+import secrets
 import uuid
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
 from django.conf import settings
+from . import bitset
 User = get_user_model()
 
 
+def parse_duration_seconds(value):
+    """Parse a 'mm:ss' or 'h:mm:ss' duration (a bare number means minutes)."""
+    parts = (value or '').strip().split(':')
+    if not all(part.strip().isdigit() for part in parts):
+        return 0
+    if len(parts) == 1:
+        return int(parts[0]) * 60
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
 class Category(models.Model):
     """Course category model."""
     
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = 'Categories'
@@ -21,6 +40,41 @@ class Category(models.Model):
         return self.name
 
 
+class CourseQuerySet(models.QuerySet):
+    """Custom queryset for courses."""
+
+    def with_stats(self):
+        """Prepare a queryset for listings (statistics are stored counters)."""
+        return self.select_related('category')
+
+    def adjust_counters(self, course_id, **deltas):
+        """Atomically add ``deltas`` to the stored counters of a course."""
+        if course_id is None or not any(deltas.values()):
+            return 0
+        return self.filter(pk=course_id).update(**{
+            name: Greatest(models.F(name) + delta, 0) for name, delta in deltas.items()
+        })
+
+    def recount_stats(self):
+        """Recompute the stored counters from the content tables."""
+        def subquery(model, aggregate):
+            rows = model.objects.filter(course=models.OuterRef('pk')).order_by().values('course')
+            return Coalesce(models.Subquery(rows.annotate(value=aggregate).values('value')), 0)
+
+        return self.update(
+            video_count=subquery(Video, models.Count('pk')),
+            pdf_count=subquery(PDF, models.Count('pk')),
+            enrollment_count=subquery(Enrollment, models.Count('pk')),
+            total_duration_seconds=subquery(Video, models.Sum('duration_seconds')),
+        )
+
+    def allocate_video_slot(self, course_id):
+        """Reserve the next never-used watched-bitmap slot of a course."""
+        with transaction.atomic():
+            self.filter(pk=course_id).update(next_video_slot=models.F('next_video_slot') + 1)
+            return self.filter(pk=course_id).values_list('next_video_slot', flat=True).get() - 1
+
+
 class Course(models.Model):
     """Course model."""
     
@@ -37,16 +91,31 @@ class Course(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=False)
     
+    # Denormalized counters, maintained by signals (see courses.signals)
+    video_count = models.PositiveIntegerField(default=0, editable=False)
+    pdf_count = models.PositiveIntegerField(default=0, editable=False)
+    enrollment_count = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_seconds = models.PositiveIntegerField(default=0, editable=False)
+    next_video_slot = models.PositiveIntegerField(default=0, editable=False)
+    
+    COUNTER_FIELDS = ('video_count', 'pdf_count', 'enrollment_count', 'total_duration_seconds', 'next_video_slot')
+    
+    objects = CourseQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return self.title
     
-    @property
-    def video_count(self):
-        """Return the number of videos in this course."""
-        return self.videos.count()
+    def save(self, *args, **kwargs):
+        # Never write back counters loaded earlier; they are only changed with F() updates
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 class Video(models.Model):
@@ -60,15 +129,79 @@ class Video(models.Model):
     video_file = models.FileField(upload_to='course_videos/', blank=True, null=True)
     video_url = models.URLField(blank=True, help_text='Alternative to uploading file')
     duration = models.CharField(max_length=20, help_text='e.g., 15:30')
+    duration_seconds = models.PositiveIntegerField(default=0, editable=False)
     order = models.PositiveIntegerField(default=0)
+    # Bit position in Enrollment.watched_bitmap; unlike order it never changes
+    slot = models.PositiveIntegerField(null=True, editable=False)
     is_free = models.BooleanField(default=False, help_text='Mark video as free for public access')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'created_at']
+        unique_together = ('course', 'slot')
     
     def __str__(self):
         return f'{self.title}'
+    
+    def save(self, *args, **kwargs):
+        self.duration_seconds = parse_duration_seconds(self.duration)
+        if self.slot is None and self.course_id is not None:
+            self.slot = Course.objects.allocate_video_slot(self.course_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'duration' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'duration_seconds'}
+        super().save(*args, **kwargs)
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    """Custom queryset for enrollments."""
+
+    def with_progress(self):
+        """Prefetch what the progress fields of an enrollment are read from."""
+        lookups = ['video_watches', 'playback_positions']
+        if getattr(settings, 'PROGRESS_WRITE_BEHIND', False):
+            lookups.append(models.Prefetch(
+                'pending_watch_events', queryset=PendingWatchEvent.objects.select_related('video'),
+            ))
+        return self.prefetch_related(*lookups)
+
+    def for_listing(self):
+        """
+        Everything EnrollmentSerializer reads, in a fixed number of queries
+        regardless of the number of enrollments.
+        """
+        return self.select_related('course__category', 'last_watched').with_progress()
+
+    def clear_watched_slot(self, course_id, slot, chunk_size=2000):
+        """Clear ``slot`` from the watched bitmaps of a course's enrollments."""
+        enrollments = self.filter(course_id=course_id)
+        index, mask = divmod(slot, 8)
+        mask = 1 << mask
+        if connections[self.db].vendor == 'postgresql':
+            # One UPDATE touching only the rows with the bit set
+            column = connections[self.db].ops.quote_name('watched_bitmap')
+            return enrollments.filter(RawSQL(
+                f'CASE WHEN length({column}) > %s THEN get_byte({column}, %s) & %s ELSE 0 END <> 0',
+                (index, index, mask),
+                output_field=models.BooleanField(),
+            )).update(watched_bitmap=RawSQL(
+                f'set_byte({column}, %s, get_byte({column}, %s) & %s)',
+                (index, index, 0xFF ^ mask),
+                output_field=models.BinaryField(),
+            ))
+
+        # Elsewhere, walk the course in primary key chunks with one bulk update each
+        updated, last_pk = 0, 0
+        while True:
+            chunk = list(enrollments.filter(pk__gt=last_pk).order_by('pk').only('id', 'watched_bitmap')[:chunk_size])
+            if not chunk:
+                return updated
+            last_pk = chunk[-1].pk
+            changed = [enrollment for enrollment in chunk if bitset.contains(enrollment.watched_bitmap, slot)]
+            for enrollment in changed:
+                enrollment.watched_bitmap = bitset.remove(enrollment.watched_bitmap, slot)
+            updated += self.bulk_update(changed, ['watched_bitmap'])
 
 
 class Enrollment(models.Model):
@@ -79,7 +212,10 @@ class Enrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     progress = models.PositiveIntegerField(default=0, help_text='Progress percentage (0-100)')
     last_watched = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='last_watched_by')
-    watched_video_ids = models.JSONField(default=list, blank=True, help_text='List of watched video IDs')
+    # Slots (see Video.slot) of watched videos, kept in step with VideoWatch rows
+    watched_bitmap = models.BinaryField(default=b'', editable=False)
+    
+    objects = EnrollmentQuerySet.as_manager()
     
     class Meta:
         unique_together = ('user', 'course')
@@ -88,30 +224,130 @@ class Enrollment(models.Model):
     def __str__(self):
         return f'{self.user.email} enrolled in {self.course.title}'
     
+    @property
+    def watched_video_ids(self):
+        """Sorted IDs of watched videos (uses prefetched video_watches when available)."""
+        ids = {watch.video_id for watch in self.video_watches.all()}
+        ids.update(event.video_id for event in self.unflushed_watch_events() if event.watched)
+        return sorted(ids)
+    
+    def unflushed_watch_events(self):
+        """Buffered events not yet flushed (always empty unless write-behind is enabled)."""
+        if not getattr(settings, 'PROGRESS_WRITE_BEHIND', False):
+            return []
+        return list(self.pending_watch_events.all())
+    
+    def has_watched(self, video):
+        return bitset.contains(self.watched_bitmap, video.slot)
+    
+    @property
+    def watched_count(self):
+        return bitset.count(self.watched_bitmap)
+    
+    @property
+    def current_progress(self):
+        """Stored progress merged with unflushed events, so it never goes backwards."""
+        events = self.unflushed_watch_events()
+        if not events:
+            return self.progress
+        from .progress import compute_progress
+        merged = bitset.add(self.watched_bitmap, *(event.video.slot for event in events if event.watched))
+        return max(self.progress, compute_progress(bitset.count(merged), self.course.video_count))
+    
+    @property
+    def current_last_watched(self):
+        """The last watched video, including unflushed events."""
+        events = self.unflushed_watch_events()
+        return events[-1].video if events else self.last_watched
+    
+    def set_watched_videos(self, video_ids):
+        """Replace the set of watched videos with ``video_ids`` from this course."""
+        slots = dict(
+            Video.objects.filter(course_id=self.course_id, id__in=video_ids).values_list('id', 'slot')
+        )
+        with transaction.atomic():
+            self.video_watches.exclude(video_id__in=slots).delete()
+            VideoWatch.objects.record((self.pk, video_id) for video_id in slots)
+            self.watched_bitmap = bitset.from_slots(slots.values())
+            Enrollment.objects.filter(pk=self.pk).update(watched_bitmap=self.watched_bitmap)
+    
     def update_progress(self):
-        """Calculate and update progress based on course duration in days."""
-        # Ensure watched_video_ids is always a list of unique integers
-        watched_ids = self.watched_video_ids or []
-        if not isinstance(watched_ids, list):
-            try:
-                import json
-                watched_ids = json.loads(watched_ids) if watched_ids else []
-            except Exception:
-                watched_ids = []
+        """Recalculate and store progress with the shared progress engine."""
+        from .progress import recompute_progress
+        recompute_progress(Enrollment.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['progress'])
+
+
+class VideoWatchQuerySet(models.QuerySet):
+    """Custom queryset for video watches."""
 
-        # Normalise and deduplicate IDs
-        normalized_ids = {int(v) for v in watched_ids if str(v).isdigit()}
+    def record(self, pairs):
+        """Upsert watches for ``(enrollment_id, video_id)`` pairs in a single statement."""
+        now = timezone.now()
+        return self.bulk_create(
+            [
+                VideoWatch(enrollment_id=enrollment_id, video_id=video_id, first_watched_at=now, last_watched_at=now)
+                for enrollment_id, video_id in pairs
+            ],
+            update_conflicts=True,
+            unique_fields=['enrollment', 'video'],
+            update_fields=['last_watched_at'],
+        )
+
+
+class VideoWatch(models.Model):
+    """A video watched by a learner within an enrollment."""
+    
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='video_watches')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='watches')
+    # Unknown (null) for watches recorded before VideoWatch rows existed
+    first_watched_at = models.DateTimeField(default=timezone.now, null=True)
+    last_watched_at = models.DateTimeField(default=timezone.now)
+    
+    objects = VideoWatchQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ('enrollment', 'video')
+        ordering = ['enrollment', 'video']
+    
+    def __str__(self):
+        return f'{self.enrollment_id} watched {self.video_id}'
+
+
+class PlaybackPosition(models.Model):
+    """Where a learner stopped in a video, reported by player heartbeats (see courses.playback)."""
+    
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='playback_positions')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='+')
+    position_seconds = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ('enrollment', 'video')
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f'{self.enrollment_id} at {self.video_id}:{self.position_seconds}s'
 
-        duration_in_days = self.course.duration_in_days
-        if duration_in_days <= 0:
-            self.progress = 0
-        else:
-            watched_count = len(normalized_ids)
-            self.progress = min(100, int((watched_count / duration_in_days) * 100))
 
-        # Persist normalized list back to the field
-        self.watched_video_ids = sorted(normalized_ids)
-        self.save()
+class PendingWatchEvent(models.Model):
+    """
+    Append-only buffer of player events in write-behind mode.
+    
+    Rows are coalesced into VideoWatch and Enrollment by the
+    ``flush_watch_events`` management command.
+    """
+    
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='pending_watch_events')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='+')
+    watched = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f'{self.enrollment_id} -> {self.video_id}'
 
 
 
@@ -142,14 +378,49 @@ class PDF(models.Model):
 
 
    
+# Crockford base32: no I, L, O or U, so codes read aloud or retyped survive
+VERIFICATION_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+VERIFICATION_CODE_LENGTH = 12
+
+
+def generate_verification_code():
+    """A random 60-bit certificate verification code."""
+    return ''.join(secrets.choice(VERIFICATION_ALPHABET) for _ in range(VERIFICATION_CODE_LENGTH))
+
+
+def normalize_verification_code(code):
+    """Undo the usual typing mistakes: case, separators and look-alike letters."""
+    code = ''.join(code.split()).replace('-', '').upper()
+    return code.translate(str.maketrans('OIL', '011'))
+
+
 class Certificate(models.Model):
 
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [(STATUS_PENDING, 'Pending'), (STATUS_READY, 'Ready'), (STATUS_FAILED, 'Failed')]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="certificates")
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="certificates")
     full_name = models.CharField(max_length=255)
     coach_name = models.CharField(max_length=255, blank=True, null=True)
     issue_date = models.DateTimeField(auto_now_add=True)
-    pdf = models.FileField(upload_to="certificates/", blank=True, null=True)
+    pdf = models.FileField(upload_to="certificates/", storage=RawMediaCloudinaryStorage(), blank=True, null=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        help_text='Rendering state of the PDF',
+    )
+    verification_code = models.CharField(
+        max_length=VERIFICATION_CODE_LENGTH,
+        unique=True,
+        default=generate_verification_code,
+        editable=False,
+        help_text='Public code third parties use to verify the certificate',
+    )
 
     def __str__(self):
         return f"{self.full_name} - {self.course.title}"
@@ -184,6 +455,7 @@ class ReviewPhoto(models.Model):
     image = models.ImageField(upload_to='reviews/')
     show_on_homepage = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     order = models.IntegerField(default=0)
     
     class Meta:
@@ -207,3 +479,90 @@ class ContactMessage(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.subject}"
+
+
+class StatCounterQuerySet(models.QuerySet):
+    """Custom queryset for dashboard counters."""
+
+    def adjust(self, **deltas):
+        """Atomically add ``deltas`` to the named counters."""
+        for name, delta in deltas.items():
+            if delta:
+                self.filter(name=name).update(value=models.F('value') + delta, updated_at=timezone.now())
+
+    def as_dict(self):
+        return dict(self.values_list('name', 'value'))
+
+
+class StatCounter(models.Model):
+    """
+    A dashboard total kept current by signals (see courses.signals) and
+    reconciled from the tables by ``manage.py reconcile_stats``.
+    """
+    
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    objects = StatCounterQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return f'{self.name}={self.value}'
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Count of events of one metric per day or week, for one course or (with
+    ``course`` unset) overall. Filled by ``manage.py build_rollups``.
+    """
+    
+    PERIOD_DAY = 'day'
+    PERIOD_WEEK = 'week'
+    PERIOD_CHOICES = [(PERIOD_DAY, 'Day'), (PERIOD_WEEK, 'Week')]
+    
+    METRIC_CHOICES = [
+        ('new_users', 'New users'),
+        ('new_enrollments', 'New enrollments'),
+        ('videos_watched', 'Videos watched'),
+        ('certificates_issued', 'Certificates issued'),
+        ('feedback', 'Feedback'),
+    ]
+    
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text='The day, or the Monday of the week')
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['period', 'metric', 'period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'metric', 'course'],
+                condition=models.Q(course__isnull=False),
+                name='unique_course_rollup',
+            ),
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'metric'],
+                condition=models.Q(course__isnull=True),
+                name='unique_overall_rollup',
+            ),
+        ]
+        indexes = [models.Index(fields=['metric', 'period', 'course', 'period_start'])]
+    
+    def __str__(self):
+        return f'{self.metric} {self.period} {self.period_start} ({self.course_id or "all"}): {self.value}'
+
+
+class RollupWatermark(models.Model):
+    """Highest source row id already counted into the rollups of a metric."""
+    
+    metric = models.CharField(max_length=30, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.metric} <= {self.last_id}'
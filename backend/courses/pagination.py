@@ -0,0 +1,213 @@
+"""
+Pagination classes.
+
+``KeysetPagination`` seeks past the last row of the previous page using the
+queryset ordering (plus the primary key as a tie-breaker) instead of OFFSET,
+so deep pages cost the same as the first one. ``SelectablePagination`` is the
+project default: page numbers unless the view or the request asks for
+cursors.
+
+Keyset ordering terms must be model fields or annotations with a known
+output field; querysets ordered by anything else (expressions, related
+lookups) fall back to page numbers.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class UnsupportedOrdering(Exception):
+    """The queryset ordering cannot be used as a keyset."""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps datetimes exact (``DjangoJSONEncoder`` drops microseconds)."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination keyed on the queryset ordering."""
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset, view)
+
+        position, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self.seek(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """
+        Return ``[(name, descending), ...]`` ending with the primary key, and
+        record the field each name is read and parsed with in ``self.fields``.
+        Raises ``UnsupportedOrdering`` for terms that are not model fields or
+        typed annotations.
+        """
+        terms = (
+            getattr(view, 'keyset_ordering', None)
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+        )
+        meta = queryset.model._meta
+        ordering = []
+        self.fields = {}
+        for term in terms:
+            if not isinstance(term, str):
+                raise UnsupportedOrdering(term)
+            name = meta.pk.name if term.lstrip('-') == 'pk' else term.lstrip('-')
+            ordering.append((name, term.startswith('-')))
+            self.fields[name] = self.resolve_field(queryset, name)
+        if not any(name == meta.pk.name for name, _ in ordering):
+            ordering.append((meta.pk.name, ordering[-1][1] if ordering else False))
+            self.fields[meta.pk.name] = (meta.pk, meta.pk.attname)
+        return ordering
+
+    def resolve_field(self, queryset, name):
+        """Return ``(field, attribute)`` for an ordering name."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            try:
+                return annotation.output_field, name
+            except FieldError:
+                raise UnsupportedOrdering(name)
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise UnsupportedOrdering(name)
+        if not field.concrete or field.many_to_many or field.one_to_many:
+            raise UnsupportedOrdering(name)
+        if field.is_relation and name != field.attname:
+            # Ordering by a relation follows the related model's ordering
+            raise UnsupportedOrdering(name)
+        return field, field.attname
+
+    def order_by(self, reverse):
+        return [
+            f'-{name}' if descending != reverse else name
+            for name, descending in self.ordering
+        ]
+
+    def seek(self, position, reverse):
+        """Build ``(a, b, c) > (x, y, z)`` row comparison as a Q object."""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {prior: position[prior] for prior, _ in self.ordering[:index]}
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[name]})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [getattr(obj, self.fields[name][1]) for name, _ in self.ordering]
+        payload = json.dumps({'p': position, 'r': reverse}, cls=CursorEncoder, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            position = {
+                name: self.fields[name][0].to_python(value)
+                for (name, _), value in zip(self.ordering, payload['p'], strict=True)
+            }
+            return position, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class SelectablePagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination when the request
+    passes ``?pagination=cursor`` or a ``cursor``. Page numbers stay the default
+    unless a view sets ``pagination_mode = 'cursor'``.
+    """
+
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def get_mode(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in ('cursor', 'page'):
+            return mode
+        if self.keyset_class.cursor_query_param in request.query_params:
+            return 'cursor'
+        return getattr(view, 'pagination_mode', 'page')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.get_mode(request, view) == 'cursor':
+            keyset = self.keyset_class()
+            try:
+                page = keyset.paginate_queryset(queryset, request, view)
+            except UnsupportedOrdering:
+                pass
+            else:
+                self.keyset = keyset
+                return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,100 @@
+"""
+Resume positions reported by player heartbeats.
+
+The latest heartbeat of a learner in a course is kept in the cache and is
+what ``resume`` reads return. It is written to ``PlaybackPosition`` at most
+once per ``PLAYBACK_PERSIST_INTERVAL`` seconds per enrollment: the first
+heartbeat of an interval takes a short-lived cache lock (``cache.add``) and
+upserts its row, later ones only refresh the cache and are kept as the
+enrollment's pending position. The pending position is written by the first
+heartbeat after the interval, when the player reports a pause or the end of
+the video, or when the learner moves on to another video, so where a learner
+stopped is not lost with the throttled heartbeats. If the cache entry is
+evicted, the resume point falls back to the last persisted row.
+
+Coalescing needs a cache shared by all workers. With a process-local cache
+(LocMem, the default without REDIS_URL) each worker would throttle and
+answer from its own copy, so every heartbeat is persisted and resume points
+are read from ``PlaybackPosition`` only.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import shared_cache_configured
+from .models import PlaybackPosition
+
+
+PLAYBACK_PERSIST_INTERVAL = getattr(settings, 'PLAYBACK_PERSIST_INTERVAL', 30)
+PLAYBACK_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def playback_cache_key(user_id, course_id):
+    return f'playback:{user_id}:{course_id}'
+
+
+def record_heartbeat(enrollment, video_id, position_seconds, final=False):
+    """
+    Record that the learner of ``enrollment`` is at ``position_seconds`` of
+    ``video_id``. ``final`` (pause, end of video) persists the position
+    regardless of the interval. Returns ``(resume, persisted)``.
+    """
+    resume = {'video_id': video_id, 'position_seconds': position_seconds, 'updated_at': timezone.now()}
+    if not shared_cache_configured():
+        _persist(enrollment, [resume])
+        return resume, True
+    cache.set(playback_cache_key(enrollment.user_id, enrollment.course_id), resume, PLAYBACK_CACHE_TIMEOUT)
+
+    pending_key = f'playback:pending:{enrollment.pk}'
+    pending = cache.get(pending_key)
+    positions = []
+    if pending is not None and pending['video_id'] != video_id:
+        # Keep where the learner stopped in the previous video
+        positions.append(pending)
+
+    persisted = final or cache.add(f'playback:lock:{enrollment.pk}', True, PLAYBACK_PERSIST_INTERVAL)
+    if persisted:
+        positions.append(resume)
+        if pending is not None:
+            cache.delete(pending_key)
+    else:
+        cache.set(pending_key, resume, PLAYBACK_CACHE_TIMEOUT)
+
+    if positions:
+        _persist(enrollment, positions)
+    return resume, persisted
+
+
+def _persist(enrollment, positions):
+    PlaybackPosition.objects.bulk_create(
+        [PlaybackPosition(enrollment_id=enrollment.pk, **position) for position in positions],
+        update_conflicts=True,
+        unique_fields=['enrollment', 'video'],
+        update_fields=['position_seconds', 'updated_at'],
+    )
+
+
+def cached_resume(user_id, course_id):
+    """The latest heartbeat of a learner in a course if it is still cached."""
+    if not shared_cache_configured():
+        return None
+    return cache.get(playback_cache_key(user_id, course_id))
+
+
+def get_resume(enrollment):
+    """
+    Where to resume ``enrollment``: ``{'video_id', 'position_seconds',
+    'updated_at'}`` or ``None`` (uses prefetched playback_positions when
+    available).
+    """
+    resume = cached_resume(enrollment.user_id, enrollment.course_id)
+    if resume is not None:
+        return resume
+    position = max(enrollment.playback_positions.all(), key=lambda p: p.updated_at, default=None)
+    if position is None:
+        return None
+    return {
+        'video_id': position.video_id,
+        'position_seconds': position.position_seconds,
+        'updated_at': position.updated_at,
+    }
@@ -0,0 +1,214 @@
+"""
+Learner progress: recording watched videos and computing progress.
+
+With ``PROGRESS_WRITE_BEHIND`` enabled, watch events are appended to the
+``PendingWatchEvent`` buffer and acknowledged immediately; ``flush_watch_buffer``
+later coalesces them into one VideoWatch upsert and one Enrollment update per
+enrollment. Reads merge unflushed events (see ``Enrollment.current_progress``).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+
+from . import bitset
+from .playback import record_heartbeat
+from .models import Course, Enrollment, PendingWatchEvent, Video, VideoWatch
+
+
+def compute_progress(watched_count, total_videos):
+    """
+    Return progress percentage (0-100) for ``watched_count`` of ``total_videos``.
+
+    This is the one progress formula; ``recompute_progress`` evaluates the
+    same integer arithmetic in SQL.
+    """
+    if total_videos <= 0:
+        return 0
+    return min(100, watched_count * 100 // total_videos)
+
+
+def progress_expression(total_videos):
+    """SQL equivalent of ``compute_progress`` for enrollments of a course with ``total_videos`` videos."""
+    if total_videos <= 0:
+        return Value(0)
+    watched = VideoWatch.objects.filter(
+        enrollment=OuterRef('pk'), video__course_id=OuterRef('course_id'),
+    ).order_by().values('enrollment').annotate(total=Count('pk')).values('total')
+    return Least(Coalesce(Subquery(watched), 0) * 100 / total_videos, 100)
+
+
+def recompute_progress(enrollments=None, chunk_size=5000):
+    """
+    Recompute stored progress of ``enrollments`` (default: all) from their
+    VideoWatch rows with set-based UPDATEs of at most ``chunk_size`` rows, one
+    course at a time. Returns the number of enrollments updated.
+    """
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+    courses = Course.objects.filter(pk__in=enrollments.values('course_id')).values_list('pk', 'video_count')
+
+    updated = 0
+    for course_id, total_videos in courses:
+        rows = enrollments.filter(course_id=course_id).order_by('pk')
+        progress = progress_expression(total_videos)
+        last_pk = 0
+        while True:
+            # Bound each chunk by primary key so every UPDATE touches at most chunk_size rows
+            upper = rows.filter(pk__gt=last_pk).values_list('pk', flat=True)[chunk_size - 1:chunk_size].first()
+            chunk = rows.filter(pk__gt=last_pk)
+            if upper is not None:
+                chunk = chunk.filter(pk__lte=upper)
+            updated += chunk.update(progress=progress)
+            if upper is None:
+                break
+            last_pk = upper
+    return updated
+
+
+def write_behind_enabled():
+    return getattr(settings, 'PROGRESS_WRITE_BEHIND', False)
+
+
+def save_watches(enrollments, watched, last_watched):
+    """
+    Persist coalesced events: upsert ``watched`` ``(enrollment_id, video_id)``
+    pairs, then store last watched video, watched bitmap and progress of
+    ``enrollments`` in one bulk update. Returns the watched video ids of each enrollment.
+    """
+    with transaction.atomic():
+        # Lock the rows first so concurrent batches cannot drop each other's bits
+        list(Enrollment.objects.select_for_update().filter(pk__in=[e.pk for e in enrollments]).values_list('pk'))
+        if watched:
+            VideoWatch.objects.record(watched)
+
+        watched_ids = defaultdict(list)
+        watched_slots = defaultdict(list)
+        rows = VideoWatch.objects.filter(enrollment__in=enrollments).order_by('video_id')
+        for enrollment_id, video_id, slot in rows.values_list('enrollment_id', 'video_id', 'video__slot'):
+            watched_ids[enrollment_id].append(video_id)
+            watched_slots[enrollment_id].append(slot)
+
+        for enrollment in enrollments:
+            enrollment.last_watched_id = last_watched[enrollment.id]
+            enrollment.watched_bitmap = bitset.from_slots(watched_slots[enrollment.id])
+            enrollment.progress = compute_progress(enrollment.watched_count, enrollment.course.video_count)
+        Enrollment.objects.bulk_update(enrollments, ['last_watched', 'watched_bitmap', 'progress'])
+    return watched_ids
+
+
+def apply_watch_events(user, events):
+    """
+    Apply a batch of player events for ``user``.
+
+    ``events`` are dicts with ``course_id``, ``video_id``, ``position_seconds``
+    and ``watched``. Events are validated against one lookup of the user's
+    enrollments and one of the courses' video ids, watched videos are upserted
+    in one statement and every affected enrollment is updated in one more.
+    Returns ``(enrollments, rejected)``: the recomputed progress of each
+    affected enrollment and the index/error of each rejected event.
+    """
+    course_ids = {event['course_id'] for event in events}
+    enrollments = {
+        enrollment.course_id: enrollment
+        for enrollment in Enrollment.objects.filter(user=user, course_id__in=course_ids).select_related('course')
+    }
+    video_courses = dict(
+        Video.objects.filter(course_id__in=enrollments).values_list('id', 'course_id')
+    )
+
+    rejected = []
+    accepted = []
+    positions = {}
+    for index, event in enumerate(events):
+        enrollment = enrollments.get(event['course_id'])
+        if enrollment is None:
+            rejected.append({'index': index, 'error': 'You are not enrolled in this course'})
+            continue
+        if video_courses.get(event['video_id']) != enrollment.course_id:
+            rejected.append({'index': index, 'error': 'Video not found in this course'})
+            continue
+        accepted.append((enrollment.id, event['video_id'], event['watched']))
+        positions[enrollment.id] = (enrollment, event['video_id'], event['position_seconds'], event['watched'])
+
+    affected_ids = {enrollment_id for enrollment_id, _, _ in accepted}
+    affected = [enrollment for enrollment in enrollments.values() if enrollment.id in affected_ids]
+    if not affected:
+        return [], rejected
+
+    # The batch's latest position per enrollment counts as one heartbeat
+    for enrollment, video_id, position_seconds, watched in positions.values():
+        record_heartbeat(enrollment, video_id, position_seconds, final=watched)
+
+    if write_behind_enabled():
+        PendingWatchEvent.objects.bulk_create([
+            PendingWatchEvent(enrollment_id=enrollment_id, video_id=video_id, watched=watched)
+            for enrollment_id, video_id, watched in accepted
+        ])
+        affected = list(Enrollment.objects.filter(id__in=affected_ids).select_related('course').with_progress())
+        return [progress_report(enrollment) for enrollment in affected], rejected
+
+    watched = set()
+    last_watched = {}
+    for enrollment_id, video_id, is_watched in accepted:
+        # Events are in playback order, so the last one wins
+        last_watched[enrollment_id] = video_id
+        if is_watched:
+            watched.add((enrollment_id, video_id))
+    watched_ids = save_watches(affected, watched, last_watched)
+
+    return [
+        {
+            'enrollment_id': enrollment.id,
+            'course_id': enrollment.course_id,
+            'progress': enrollment.progress,
+            'last_watched': enrollment.last_watched_id,
+            'watched_video_ids': watched_ids[enrollment.id],
+            'total_videos': enrollment.course.video_count,
+        }
+        for enrollment in affected
+    ], rejected
+
+
+def progress_report(enrollment):
+    """Progress of an enrollment as returned by the watch endpoints, unflushed events included."""
+    last_watched = enrollment.current_last_watched
+    return {
+        'enrollment_id': enrollment.id,
+        'course_id': enrollment.course_id,
+        'progress': enrollment.current_progress,
+        'last_watched': last_watched.id if last_watched else None,
+        'watched_video_ids': enrollment.watched_video_ids,
+        'total_videos': enrollment.course.video_count,
+    }
+
+
+def flush_watch_buffer(batch_size=5000, course_ids=None):
+    """
+    Apply buffered watch events (only those of ``course_ids`` when given);
+    returns the number of events flushed.
+    """
+    pending = PendingWatchEvent.objects.order_by('id')
+    if course_ids:
+        pending = pending.filter(enrollment__course_id__in=course_ids)
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            events = list(pending.values_list('id', 'enrollment_id', 'video_id', 'watched')[:batch_size])
+            if not events:
+                return flushed
+
+            watched = set()
+            last_watched = {}
+            for _, enrollment_id, video_id, is_watched in events:
+                last_watched[enrollment_id] = video_id
+                if is_watched:
+                    watched.add((enrollment_id, video_id))
+            enrollments = list(Enrollment.objects.filter(id__in=last_watched).select_related('course'))
+            save_watches(enrollments, watched, last_watched)
+
+            # Delete exactly what was read; rows committed meanwhile stay buffered
+            PendingWatchEvent.objects.filter(id__in=[event_id for event_id, *_ in events]).delete()
+        flushed += len(events)
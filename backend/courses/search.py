@@ -0,0 +1,156 @@
+"""
+Full-text search index for courses.
+
+Production (PostgreSQL) keeps a ``tsvector`` column with a GIN index on the
+course table; local SQLite keeps an FTS5 shadow table keyed by course id.
+Both are fed the same Arabic-normalized document, and queries are normalized
+the same way, so spelling variants of a word match each other.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+# Harakat, Quranic annotation marks and superscript alef
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06dc\u06df-\u06e8\u06ea-\u06ed]')
+TATWEEL = '\u0640'
+ARABIC_LETTER_FORMS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+TOKEN_RE = re.compile(r'\w+')
+DEFINITE_ARTICLE = 'ال'
+
+SEARCH_CONFIG = 'simple'
+
+
+def normalize_arabic(text):
+    """Normalize text for indexing and querying."""
+    if not text:
+        return ''
+    text = ARABIC_DIACRITICS.sub('', text).replace(TATWEEL, '')
+    return text.translate(ARABIC_LETTER_FORMS).casefold()
+
+
+def tokenize(text):
+    """Split normalized text into terms, dropping the definite article prefix."""
+    terms = []
+    for token in TOKEN_RE.findall(normalize_arabic(text)):
+        if token.startswith(DEFINITE_ARTICLE) and len(token) > len(DEFINITE_ARTICLE) + 1:
+            token = token[len(DEFINITE_ARTICLE):]
+        terms.append(token)
+    return terms
+
+
+def build_search_document(course):
+    """Return the normalized text indexed for a course."""
+    return ' '.join(tokenize(f'{course.title} {course.description}'))
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def create_index(model, schema_editor):
+    """Create the vendor-specific search structures for ``model``."""
+    table = model._meta.db_table
+    quote = schema_editor.quote_name
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE {quote(table)} ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            f'CREATE INDEX {quote(table + "_search_vector_gin")} ON {quote(table)} USING GIN (search_vector)'
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {quote(fts_table(model))} USING fts5(document, tokenize = 'unicode61')"
+        )
+
+
+def drop_index(model, schema_editor):
+    """Drop the structures created by :func:`create_index`."""
+    table = model._meta.db_table
+    quote = schema_editor.quote_name
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {quote(table + "_search_vector_gin")}')
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP COLUMN IF EXISTS search_vector')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {quote(fts_table(model))}')
+
+
+def index_course(course, using=None):
+    """Write (or rewrite) the search entry of a single course."""
+    index_documents(type(course), [(course.pk, build_search_document(course))], using=using)
+
+
+def index_documents(model, documents, using=None):
+    """Write search entries for ``(pk, document)`` pairs."""
+    conn = connections[using or DEFAULT_DB_ALIAS]
+    table = model._meta.db_table
+    quote = conn.ops.quote_name
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.executemany(
+                f'UPDATE {quote(table)} SET search_vector = to_tsvector(%s, %s) WHERE id = %s',
+                [(SEARCH_CONFIG, document, pk) for pk, document in documents],
+            )
+        elif conn.vendor == 'sqlite':
+            fts = quote(fts_table(model))
+            cursor.executemany(f'DELETE FROM {fts} WHERE rowid = %s', [(pk,) for pk, _ in documents])
+            cursor.executemany(f'INSERT INTO {fts} (rowid, document) VALUES (%s, %s)', list(documents))
+
+
+def unindex_course(model, pk, using=None):
+    """Remove a course from the SQLite shadow table (Postgres drops it with the row)."""
+    conn = connections[using or DEFAULT_DB_ALIAS]
+    if conn.vendor == 'sqlite':
+        with conn.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {conn.ops.quote_name(fts_table(model))} WHERE rowid = %s', [pk])
+
+
+def search_courses(queryset, query):
+    """Filter ``queryset`` to courses matching ``query``, best matches first."""
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    model = queryset.model
+    table = model._meta.db_table
+    quote = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT id FROM {quote(table)} WHERE search_vector @@ to_tsquery(%s, %s)',
+                (SEARCH_CONFIG, tsquery),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank({quote(table)}.search_vector, to_tsquery(%s, %s))',
+                (SEARCH_CONFIG, tsquery),
+                output_field=FloatField(),
+            ),
+        ).order_by('-search_rank', *model._meta.ordering)
+
+    if connection.vendor == 'sqlite':
+        fts = quote(fts_table(model))
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', (match,)),
+        ).annotate(
+            # bm25() is lower for better matches
+            search_rank=RawSQL(
+                f'(SELECT bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {quote(table)}.id)',
+                (match,),
+                output_field=FloatField(),
+            ),
+        ).order_by('search_rank', *model._meta.ordering)
+
+    for token in tokens:
+        queryset = queryset.filter(Q(title__icontains=token) | Q(description__icontains=token))
+    return queryset
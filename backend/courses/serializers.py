@@ -1,5 +1,12 @@
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Course, Video, Enrollment, Category, PDF, Certificate, Feedback, ReviewPhoto, ContactMessage
+from .access import is_enrolled
+from .downloads import download_url
+from .enrollments import parse_csv_rows
+from .upsert import insert_or_ignore
+from .playback import get_resume
 
 
 class ContactMessageSerializer(serializers.ModelSerializer):
@@ -127,12 +134,13 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     videos = VideoSerializer(many=True, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     thumbnail_url = serializers.SerializerMethodField()
-    is_enrolled = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
+        # User-independent so the document can be cached and shared; the view
+        # adds is_enrolled and the caller's progress on top.
         fields = ('id', 'title', 'description', 'thumbnail_url', 'category_name', 'duration', 'price', 'is_free', 'video_count', 
-                  'videos', 'is_enrolled', 'created_at', 'updated_at')
+                  'videos', 'created_at', 'updated_at')
     
     def get_thumbnail_url(self, obj):
         """Return the full thumbnail URL (prioritize URL over file)."""
@@ -146,13 +154,6 @@ class CourseDetailSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.thumbnail.url)
             return obj.thumbnail.url
         return None
-    
-    def get_is_enrolled(self, obj):
-        """Check if the current user is enrolled in this course."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Enrollment.objects.filter(user=request.user, course=obj).exists()
-        return False
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
@@ -162,10 +163,13 @@ class EnrollmentSerializer(serializers.ModelSerializer):
     course_thumbnail = serializers.SerializerMethodField()
     last_watched_title = serializers.CharField(source='last_watched.title', read_only=True)
     course = CourseListSerializer(read_only=True)  # nested course data
+    # Backed by VideoWatch rows; kept for clients of the former JSON field
+    watched_video_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    resume = serializers.SerializerMethodField()
     
     class Meta:
         model = Enrollment
-        fields = ('id', 'user', 'course', 'enrolled_at', 'progress', 'last_watched', 'course_title', 'course_thumbnail', 'last_watched_title', 'watched_video_ids')
+        fields = ('id', 'user', 'course', 'enrolled_at', 'progress', 'last_watched', 'course_title', 'course_thumbnail', 'last_watched_title', 'watched_video_ids', 'resume')
     
     def get_course_thumbnail(self, obj):
         """Return the full thumbnail URL."""
@@ -175,6 +179,26 @@ class EnrollmentSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.course.thumbnail.url)
             return obj.course.thumbnail.url
         return None
+    
+    def get_resume(self, obj):
+        """Latest playback position: video_id, position_seconds, updated_at."""
+        return get_resume(obj)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Include watch events still waiting in the write-behind buffer
+        if instance.unflushed_watch_events():
+            last_watched = instance.current_last_watched
+            data['progress'] = instance.current_progress
+            data['last_watched'] = last_watched.id
+            data['last_watched_title'] = last_watched.title
+        return data
+
+    def update(self, instance, validated_data):
+        watched_video_ids = validated_data.pop('watched_video_ids', None)
+        if watched_video_ids is not None:
+            instance.set_watched_videos(watched_video_ids)
+        return super().update(instance, validated_data)
 
 
 class EnrollmentCreateSerializer(serializers.ModelSerializer):
@@ -189,6 +213,28 @@ class EnrollmentCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class WatchEventSerializer(serializers.Serializer):
+    """A single player event in a watch batch."""
+    
+    course_id = serializers.IntegerField()
+    video_id = serializers.IntegerField()
+    position_seconds = serializers.IntegerField(min_value=0, required=False, default=0)
+    watched = serializers.BooleanField(required=False, default=False)
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    """Serializer for player position heartbeats."""
+    
+    position_seconds = serializers.IntegerField(min_value=0)
+    event = serializers.ChoiceField(choices=('heartbeat', 'pause', 'ended'), required=False, default='heartbeat')
+
+
+class WatchEventBatchSerializer(serializers.Serializer):
+    """Serializer for batched watch/heartbeat events."""
+    
+    events = WatchEventSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class PDFSerializer(serializers.ModelSerializer):
     """Serializer for PDF documents."""
     
@@ -199,20 +245,21 @@ class PDFSerializer(serializers.ModelSerializer):
         model = PDF
         fields = ('id', 'course', 'course_title', 'title', 'description', 'pdf_file', 'pdf_url', 'order', 'created_at', 'updated_at')
         read_only_fields = ('created_at', 'updated_at')
+        # Only enrolled users may read the file; they get a short-lived pdf_url
+        extra_kwargs = {'pdf_file': {'write_only': True}}
     
     def get_pdf_url(self, obj):
-        """Return the full PDF URL."""
-        if obj.pdf_file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.pdf_file.url)
-            return obj.pdf_file.url
-        return None
+        """Return a short-lived URL of the PDF (see courses.downloads)."""
+        request = self.context.get('request')
+        if not obj.pdf_file or request is None:
+            return None
+        return download_url(request, obj.pdf_file, reverse('course_pdf_download', args=(obj.course_id, obj.pk)))
 
 
 class CertificateSerializer(serializers.ModelSerializer):
     user_email = serializers.CharField(source="user.email", read_only=True)
     course_title = serializers.CharField(source="course.title", read_only=True)
+    pdf = serializers.SerializerMethodField()
 
     class Meta:
         model = Certificate
@@ -226,8 +273,17 @@ class CertificateSerializer(serializers.ModelSerializer):
             "coach_name",
             "issue_date",
             "pdf",
+            "status",
+            "verification_code",
         ]
-        read_only_fields = ["issue_date", "pdf"]
+        read_only_fields = ["issue_date", "status", "verification_code"]
+
+    def get_pdf(self, obj):
+        """Short-lived URL of the rendered PDF (see courses.downloads)."""
+        request = self.context.get("request")
+        if obj.status != Certificate.STATUS_READY or not obj.pdf or request is None:
+            return None
+        return download_url(request, obj.pdf, reverse("certificate_download", args=(obj.pk,)))
 
 class AdminAssignCourseSerializer(serializers.Serializer):
     """Serializer for admin to assign courses to users."""
@@ -251,19 +307,22 @@ class AdminAssignCourseSerializer(serializers.Serializer):
         except Course.DoesNotExist:
             raise serializers.ValidationError("الدورة غير موجودة")
         
-        # Check if already enrolled
-        if Enrollment.objects.filter(user=user, course=course).exists():
-            raise serializers.ValidationError("المستخدم مسجل في هذه الدورة بالفعل")
-        
         attrs['user'] = user
         attrs['course'] = course
         return attrs
     
     def save(self):
-        return Enrollment.objects.create(
+        # The insert itself detects an existing enrollment, so concurrent assigns cannot collide
+        enrollment = insert_or_ignore(
+            Enrollment, ('user', 'course'),
             user=self.validated_data['user'],
             course=self.validated_data['course']
         )
+        if enrollment is None:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ["المستخدم مسجل في هذه الدورة بالفعل"],
+            })
+        return enrollment
 
 
 class AdminUnassignCourseSerializer(serializers.Serializer):
@@ -273,6 +332,34 @@ class AdminUnassignCourseSerializer(serializers.Serializer):
     course_id = serializers.IntegerField()
 
 
+class AdminBulkEnrollmentSerializer(serializers.Serializer):
+    """
+    Serializer for admin bulk assign/unassign: JSON ``rows`` of
+    ``{email|user_id, course_id}`` or an uploaded CSV ``file`` with those columns.
+    """
+    
+    rows = serializers.ListField(child=serializers.DictField(), required=False, max_length=20000)
+    file = serializers.FileField(required=False)
+    
+    def validate(self, attrs):
+        if 'file' in attrs:
+            try:
+                text = attrs.pop('file').read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise serializers.ValidationError("يجب أن يكون الملف بترميز UTF-8")
+            attrs['rows'] = parse_csv_rows(text)
+        if not attrs.get('rows'):
+            raise serializers.ValidationError("يجب إرسال rows أو ملف CSV")
+        return attrs
+
+
+class AdminIssueCertificatesSerializer(serializers.Serializer):
+    """Serializer for admin bulk certificate issuance to course completers."""
+    
+    course_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    coach_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+
 class FeedbackSerializer(serializers.ModelSerializer):
     """Serializer for course feedback/reviews."""
     
@@ -301,12 +388,31 @@ class FeedbackSerializer(serializers.ModelSerializer):
         """Validate that user is enrolled in the course."""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            course = data.get('course') or self.instance.course if self.instance else None
+            course = data.get('course') or (self.instance.course if self.instance else None)
             if course:
-                is_enrolled = Enrollment.objects.filter(user=request.user, course=course).exists()
-                if not is_enrolled:
+                if not is_enrolled(request.user, course.id):
                     raise serializers.ValidationError("You must be enrolled in this course to leave feedback")
         return data
+    
+    def create(self, validated_data):
+        """
+        Create the feedback, or update the user's existing feedback for the
+        course, in one statement. ``self.created`` tells which happened.
+        """
+        feedback = Feedback(**validated_data)
+        Feedback.objects.bulk_create(
+            [feedback],
+            update_conflicts=True,
+            unique_fields=['user', 'course'],
+            update_fields=['rating', 'comment', 'updated_at'],
+        )
+        # The instance holds the values of the attempted insert; an update
+        # keeps the stored created_at (and pk, on backends that don't return it)
+        stored = Feedback.objects.select_related('user', 'course').get(
+            user=feedback.user, course=feedback.course,
+        )
+        self.created = stored.created_at == feedback.created_at
+        return stored
 
 
 class ReviewPhotoSerializer(serializers.ModelSerializer):
@@ -0,0 +1,229 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .access import invalidate_enrolled_courses
+from .cache import bump_catalog_version
+from .models import Course, Video, Category, PDF, Enrollment, StatCounter, Certificate
+from .tasks import schedule_certificate_render, schedule_progress_recompute
+from . import search
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, using, **kwargs):
+    """Keep the course search index in sync with title/description edits."""
+    search.index_course(instance, using=using)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course_on_delete(sender, instance, using, **kwargs):
+    search.unindex_course(sender, instance.pk, using=using)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=PDF)
+@receiver(post_delete, sender=PDF)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any catalog content change invalidates the cached public responses."""
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=Video)
+@receiver(pre_save, sender=PDF)
+def remember_counted_state(sender, instance, **kwargs):
+    """Load the stored course/duration so post_save can apply counter deltas."""
+    instance._counted_state = None
+    if instance.pk and not instance._state.adding:
+        fields = ('course_id', 'duration_seconds', 'slot') if sender is Video else ('course_id',)
+        instance._counted_state = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    previous = instance._counted_state
+    if sender is Video and previous and previous['course_id'] != instance.course_id:
+        # Slots are per course: take a fresh one in the new course
+        instance.slot = Course.objects.allocate_video_slot(instance.course_id) if instance.course_id else None
+
+
+@receiver(post_save, sender=Video)
+def count_video_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_counted_state', None)
+    if created or previous is None:
+        Course.objects.adjust_counters(
+            instance.course_id, video_count=1, total_duration_seconds=instance.duration_seconds,
+        )
+    elif previous['course_id'] != instance.course_id:
+        if previous['course_id'] is not None:
+            Course.objects.adjust_counters(
+                previous['course_id'], video_count=-1, total_duration_seconds=-previous['duration_seconds'],
+            )
+            if previous['slot'] is not None:
+                Enrollment.objects.clear_watched_slot(previous['course_id'], previous['slot'])
+        Course.objects.adjust_counters(
+            instance.course_id, video_count=1, total_duration_seconds=instance.duration_seconds,
+        )
+    else:
+        Course.objects.adjust_counters(
+            instance.course_id, total_duration_seconds=instance.duration_seconds - previous['duration_seconds'],
+        )
+
+
+@receiver(post_delete, sender=Video)
+def uncount_video_on_delete(sender, instance, **kwargs):
+    Course.objects.adjust_counters(
+        instance.course_id, video_count=-1, total_duration_seconds=-instance.duration_seconds,
+    )
+    # Slots are never reused, but a stale bit would still be counted as watched
+    if instance.slot is not None:
+        Enrollment.objects.clear_watched_slot(instance.course_id, instance.slot)
+
+
+@receiver(post_save, sender=PDF)
+def count_pdf_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_counted_state', None)
+    if created or previous is None:
+        Course.objects.adjust_counters(instance.course_id, pdf_count=1)
+    elif previous['course_id'] != instance.course_id:
+        Course.objects.adjust_counters(previous['course_id'], pdf_count=-1)
+        Course.objects.adjust_counters(instance.course_id, pdf_count=1)
+
+
+@receiver(post_delete, sender=PDF)
+def uncount_pdf_on_delete(sender, instance, **kwargs):
+    Course.objects.adjust_counters(instance.course_id, pdf_count=-1)
+
+
+_enrollment_batch = ContextVar('enrollment_batch', default=None)
+
+
+class EnrollmentBatch:
+    """Side effects of enrollment writes, collected to be applied once."""
+
+    def __init__(self):
+        self.course_deltas = Counter()
+        self.user_ids = set()
+
+    def add(self, user_id, course_id, delta):
+        self.course_deltas[course_id] += delta
+        self.user_ids.add(user_id)
+
+    def apply(self):
+        for course_id, delta in self.course_deltas.items():
+            Course.objects.adjust_counters(course_id, enrollment_count=delta)
+        StatCounter.objects.adjust(total_enrollments=sum(self.course_deltas.values()))
+        if self.user_ids:
+            invalidate_enrolled_courses(*self.user_ids)
+
+
+@contextmanager
+def batched_enrollment_signals():
+    """
+    Collect enrollment counter and access-cache updates made inside the block
+    and apply them once per course/user when it exits without error.
+
+    Writes that send no signals (bulk_create) record themselves with
+    ``batch.add(user_id, course_id, delta)``.
+    """
+    batch = EnrollmentBatch()
+    token = _enrollment_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _enrollment_batch.reset(token)
+    batch.apply()
+
+
+def record_enrollment_change(instance, delta):
+    batch = _enrollment_batch.get()
+    if batch is not None:
+        batch.add(instance.user_id, instance.course_id, delta)
+        return
+    Course.objects.adjust_counters(instance.course_id, enrollment_count=delta)
+    StatCounter.objects.adjust(total_enrollments=delta)
+    invalidate_enrolled_courses(instance.user_id)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment_on_save(sender, instance, created, **kwargs):
+    # Progress and last-watched updates leave the counters and the access cache alone
+    if created:
+        record_enrollment_change(instance, 1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def uncount_enrollment_on_delete(sender, instance, **kwargs):
+    record_enrollment_change(instance, -1)
+
+
+@receiver(post_save, sender=Video)
+def recompute_progress_on_video_save(sender, instance, created, **kwargs):
+    """Adding or moving a video changes the progress of every enrollment involved."""
+    previous = getattr(instance, '_counted_state', None)
+    if created or previous is None:
+        schedule_progress_recompute(instance.course_id)
+    elif previous['course_id'] != instance.course_id:
+        schedule_progress_recompute(previous['course_id'])
+        schedule_progress_recompute(instance.course_id)
+
+
+@receiver(post_delete, sender=Video)
+def recompute_progress_on_video_delete(sender, instance, **kwargs):
+    schedule_progress_recompute(instance.course_id)
+
+
+@receiver(post_save, sender=Certificate)
+def render_certificate_on_create(sender, instance, created, raw=False, **kwargs):
+    """New certificates get their PDF rendered in the background."""
+    if created and not raw and instance.status == Certificate.STATUS_PENDING:
+        schedule_certificate_render(instance.pk)
+
+
+# Dashboard totals (see courses.stats)
+
+STAT_COUNTED_MODELS = {
+    'courses.Video': 'total_videos',
+    'courses.PDF': 'total_pdfs',
+    'courses.Certificate': 'total_certificates',
+    settings.AUTH_USER_MODEL: 'total_users',
+}
+
+
+def count_stat_on_save(sender, instance, created, **kwargs):
+    if created:
+        StatCounter.objects.adjust(**{STAT_COUNTED_MODELS[sender._meta.label]: 1})
+
+
+def uncount_stat_on_delete(sender, instance, **kwargs):
+    StatCounter.objects.adjust(**{STAT_COUNTED_MODELS[sender._meta.label]: -1})
+
+
+for counted_model in STAT_COUNTED_MODELS:
+    post_save.connect(count_stat_on_save, sender=counted_model, dispatch_uid=f'stats_save_{counted_model}')
+    post_delete.connect(uncount_stat_on_delete, sender=counted_model, dispatch_uid=f'stats_delete_{counted_model}')
+
+
+@receiver(pre_save, sender=Course)
+def remember_published_state(sender, instance, **kwargs):
+    instance._was_published = None
+    if instance.pk and not instance._state.adding:
+        instance._was_published = sender.objects.filter(pk=instance.pk).values_list('is_published', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def count_course_on_save(sender, instance, created, **kwargs):
+    was_published = getattr(instance, '_was_published', None)
+    if created or was_published is None:
+        StatCounter.objects.adjust(total_courses=1, published_courses=int(instance.is_published))
+    elif was_published != instance.is_published:
+        StatCounter.objects.adjust(published_courses=1 if instance.is_published else -1)
+
+
+@receiver(post_delete, sender=Course)
+def uncount_course_on_delete(sender, instance, **kwargs):
+    StatCounter.objects.adjust(total_courses=-1, published_courses=-int(instance.is_published))
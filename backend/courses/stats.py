@@ -0,0 +1,50 @@
+"""
+Admin dashboard totals.
+
+Each total is a ``StatCounter`` row adjusted by signals whenever the counted
+rows are created or deleted, so the dashboard reads all of them in one
+query. ``reconcile_stats`` recounts the tables and corrects any drift (rows
+written with ``QuerySet.update``/raw SQL, failed signal handlers, ...).
+"""
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .models import Certificate, Course, Enrollment, PDF, StatCounter, Video
+
+
+STAT_NAMES = (
+    'total_courses', 'published_courses', 'total_videos', 'total_users',
+    'total_enrollments', 'total_pdfs', 'total_certificates',
+)
+
+
+def _exact_counts():
+    User = get_user_model()
+    return {
+        'total_courses': Course.objects.count(),
+        'published_courses': Course.objects.filter(is_published=True).count(),
+        'total_videos': Video.objects.count(),
+        'total_users': User.objects.count(),
+        'total_enrollments': Enrollment.objects.count(),
+        'total_pdfs': PDF.objects.count(),
+        'total_certificates': Certificate.objects.count(),
+    }
+
+
+def read_stats():
+    """Return the maintained totals (one query)."""
+    counters = StatCounter.objects.as_dict()
+    return {name: counters.get(name, 0) for name in STAT_NAMES}
+
+
+def reconcile_stats():
+    """
+    Recount every total from its table and store the exact values.
+    Returns ``(stats, drift)`` where ``drift`` maps names to corrections.
+    """
+    exact = _exact_counts()
+    stored = StatCounter.objects.as_dict()
+    drift = {name: value - stored.get(name, 0) for name, value in exact.items() if value != stored.get(name)}
+    for name in drift:
+        StatCounter.objects.update_or_create(name=name, defaults={'value': exact[name], 'updated_at': timezone.now()})
+    return exact, drift
@@ -0,0 +1,199 @@
+"""
+Background work started from request/signal handlers.
+
+Jobs run after the surrounding transaction commits, on a small in-process
+thread pool, so admin edits return without waiting for bulk recomputations.
+Requests for the same course that are still queued are merged.
+
+Certificate PDFs are CPU-bound, so they are rendered on a process pool
+(``CERTIFICATE_RENDER_WORKERS`` processes, each holding a pre-built
+template); threads only hand the work over and store the results.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import certificates
+
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='courses-tasks')
+_queued = set()
+_lock = threading.Lock()
+
+_certificate_executor = None
+_render_pool = None
+
+
+def schedule_progress_recompute(course_id):
+    """Recompute progress of every enrollment in a course once the current transaction commits."""
+    if course_id is None:
+        return
+    transaction.on_commit(lambda: _enqueue(course_id))
+
+
+def _enqueue(course_id):
+    if not getattr(settings, 'PROGRESS_RECOMPUTE_ASYNC', True):
+        _recompute_course_progress(course_id)
+        return
+    with _lock:
+        if course_id in _queued:
+            return
+        _queued.add(course_id)
+    _executor.submit(_run_queued, course_id)
+
+
+def _run_queued(course_id):
+    with _lock:
+        # Dequeue before running so changes made meanwhile schedule another pass
+        _queued.discard(course_id)
+    try:
+        _recompute_course_progress(course_id)
+    except Exception:
+        logger.exception('Progress recomputation failed for course %s', course_id)
+    finally:
+        connection.close()
+
+
+def _recompute_course_progress(course_id):
+    from .models import Enrollment
+    from .progress import recompute_progress
+    recompute_progress(Enrollment.objects.filter(course_id=course_id))
+
+
+def certificate_template_config():
+    """Template arguments for ``certificates.load_template``, from settings."""
+    return (
+        getattr(settings, 'CERTIFICATE_BACKGROUND', None),
+        getattr(settings, 'CERTIFICATE_SIGNATURE', None),
+        getattr(settings, 'CERTIFICATE_FONT', None),
+        getattr(settings, 'CERTIFICATE_BOLD_FONT', None),
+    )
+
+
+def _render_workers():
+    return max(1, getattr(settings, 'CERTIFICATE_RENDER_WORKERS', 2))
+
+
+def create_render_pool(workers=None):
+    """A process pool whose workers each pre-build the certificate template."""
+    # Spawned workers import only the renderer: no Django setup, no
+    # inherited database connections or threads.
+    return ProcessPoolExecutor(
+        max_workers=workers or _render_workers(),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=certificates.load_template,
+        initargs=certificate_template_config(),
+    )
+
+
+def _get_render_pool():
+    global _render_pool
+    with _lock:
+        if _render_pool is None:
+            _render_pool = create_render_pool()
+        return _render_pool
+
+
+def schedule_certificate_render(certificate_id):
+    """Render a certificate's PDF in the background once the current transaction commits."""
+    transaction.on_commit(lambda: _enqueue_certificate(certificate_id))
+
+
+def schedule_certificate_batch(certificate_ids, chunk_size=200):
+    """Render many certificates in the background, chunk by chunk, once the current transaction commits."""
+    certificate_ids = list(certificate_ids)
+    for start in range(0, len(certificate_ids), chunk_size):
+        chunk = certificate_ids[start:start + chunk_size]
+        transaction.on_commit(lambda chunk=chunk: _enqueue_certificate(*chunk))
+
+
+def _enqueue_certificate(*certificate_ids):
+    global _certificate_executor
+    if not getattr(settings, 'CERTIFICATE_RENDERING', True):
+        # Left pending for render_pending_certificates
+        return
+    if not getattr(settings, 'CERTIFICATE_RENDER_ASYNC', True):
+        render_certificates(certificate_ids)
+        return
+    with _lock:
+        if _certificate_executor is None:
+            _certificate_executor = ThreadPoolExecutor(max_workers=_render_workers(), thread_name_prefix='certificates')
+    _certificate_executor.submit(_run_certificate_render, certificate_ids)
+
+
+def _run_certificate_render(certificate_ids):
+    try:
+        render_certificates(certificate_ids)
+    except Exception:
+        logger.exception('Certificate rendering failed for certificates %s', certificate_ids)
+    finally:
+        connection.close()
+
+
+def certificate_data(certificate):
+    """The plain values a render worker needs for ``certificate``."""
+    return {
+        'full_name': certificate.full_name,
+        'course_title': certificate.course.title,
+        'coach_name': certificate.coach_name or '',
+        'issue_date': timezone.localtime(certificate.issue_date).strftime('%Y/%m/%d'),
+        'verification_code': certificate.verification_code,
+    }
+
+
+def render_certificates(certificate_ids, use_pool=None, pool=None):
+    """
+    Render and store the PDFs of ``certificate_ids``, marking each one ready
+    or failed. Rendering uses the shared process pool (or ``pool``) unless
+    ``use_pool`` is False (default: ``CERTIFICATE_RENDER_ASYNC``).
+    Returns ``{status: count}``.
+    """
+    from .models import Certificate
+
+    if use_pool is None:
+        use_pool = pool is not None or getattr(settings, 'CERTIFICATE_RENDER_ASYNC', True)
+    pending = list(Certificate.objects.filter(pk__in=certificate_ids).select_related('course'))
+    if use_pool:
+        pool = pool or _get_render_pool()
+        futures = {pool.submit(certificates.render_certificate, certificate_data(certificate)): certificate
+                   for certificate in pending}
+        # Store each PDF as soon as it is rendered, while the others render
+        jobs = ((futures[future], future) for future in as_completed(futures))
+    else:
+        template = certificates.load_template(*certificate_template_config())
+        jobs = ((certificate, None) for certificate in pending)
+
+    results = {Certificate.STATUS_READY: 0, Certificate.STATUS_FAILED: 0}
+    for certificate, future in jobs:
+        try:
+            pdf = future.result() if future else certificates.render_certificate(certificate_data(certificate), template)
+            _store_certificate_pdf(certificate, pdf)
+        except Exception as exc:
+            if isinstance(exc, certificates.MissingFontError):
+                # A configuration problem: no traceback for every certificate
+                logger.error('Could not render certificate %s: %s', certificate.pk, exc)
+            else:
+                logger.exception('Could not render certificate %s', certificate.pk)
+            Certificate.objects.filter(pk=certificate.pk).update(status=Certificate.STATUS_FAILED)
+            results[Certificate.STATUS_FAILED] += 1
+        else:
+            results[Certificate.STATUS_READY] += 1
+    return results
+
+
+def _store_certificate_pdf(certificate, pdf):
+    from .models import Certificate
+
+    previous = certificate.pdf.name
+    certificate.pdf.save(f'certificate_{certificate.pk}.pdf', ContentFile(pdf), save=False)
+    Certificate.objects.filter(pk=certificate.pk).update(pdf=certificate.pdf.name, status=Certificate.STATUS_READY)
+    if previous and previous != certificate.pdf.name:
+        certificate.pdf.storage.delete(previous)
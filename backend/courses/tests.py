@@ -0,0 +1,437 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from reportlab import rl_config
+from rest_framework.test import APIClient
+
+from .access import is_enrolled
+from .certificates import CertificateTemplate, MissingFontError, render_certificate
+from .checks import check_certificate_font
+from .enrollments import bulk_assign
+from .issuance import completed_without_certificate, issue_certificates
+from .models import Category, Certificate, Course, Enrollment, Feedback, PDF, PlaybackPosition, Video, VideoWatch
+
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pagination over rows whose sort keys differ by microseconds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='x', is_staff=True)
+        category = Category.objects.create(name='Nutrition')
+        cls.course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def collect(self, url, max_pages=20):
+        ids = []
+        for _ in range(max_pages):
+            if not url:
+                return ids
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.fail(f'Still paging after {max_pages} pages: {ids}')
+
+    def test_rows_within_the_same_millisecond(self):
+        base = timezone.now().replace(microsecond=123000)
+        pdfs = [PDF.objects.create(course=self.course, title=f'pdf {i}', order=0) for i in range(7)]
+        for i, pdf in enumerate(pdfs):
+            PDF.objects.filter(pk=pdf.pk).update(created_at=base + timedelta(microseconds=7 - i))
+
+        ids = self.collect('/api/admin/pdfs/?pagination=cursor&page_size=2')
+
+        expected = list(PDF.objects.order_by('order', 'created_at', 'pk').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_numbers_are_the_default(self):
+        PDF.objects.create(course=self.course, title='pdf', order=0)
+
+        response = self.client.get('/api/admin/pdfs/?page_size=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_descending_rows_within_the_same_millisecond(self):
+        base = timezone.now().replace(microsecond=456000)
+        for i in range(7):
+            user = User.objects.create_user(email=f'learner{i}@example.com', password='x')
+            feedback = Feedback.objects.create(user=user, course=self.course, rating=5, comment='Great')
+            Feedback.objects.filter(pk=feedback.pk).update(created_at=base + timedelta(microseconds=i % 3))
+
+        ids = self.collect(f'/api/feedbacks/?course={self.course.pk}&pagination=cursor&page_size=2')
+
+        expected = list(Feedback.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_search_results_page_by_rank(self):
+        for i in range(4):
+            Course.objects.create(
+                title=f'Nutrition {i}', description='Nutrition plans', category=self.course.category,
+                duration='1h', is_published=True,
+            )
+
+        ids = self.collect('/api/courses/?search=nutrition&pagination=cursor&page_size=2')
+
+        self.assertEqual(sorted(ids), sorted(Course.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/courses-tests-cache'}}
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class PlaybackHeartbeatTests(TestCase):
+    """Throttled heartbeats still persist where the learner stopped."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        cls.course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        cls.first, cls.second = [
+            Video.objects.create(course=cls.course, title=f'Video {i}', duration='10:00', order=i) for i in range(2)
+        ]
+        cls.enrollment = Enrollment.objects.create(user=cls.learner, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def beat(self, video, position_seconds, **extra):
+        url = f'/api/courses/{self.course.pk}/videos/{video.pk}/position/'
+        response = self.client.post(url, {'position_seconds': position_seconds, **extra}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['persisted']
+
+    def stored(self, video):
+        return PlaybackPosition.objects.get(enrollment=self.enrollment, video=video).position_seconds
+
+    def test_pause_persists_the_latest_position(self):
+        self.assertTrue(self.beat(self.first, 10))
+        self.assertFalse(self.beat(self.first, 40))
+        self.assertEqual(self.stored(self.first), 10)
+
+        self.assertTrue(self.beat(self.first, 55, event='pause'))
+        self.assertEqual(self.stored(self.first), 55)
+
+    def test_switching_videos_persists_the_pending_position(self):
+        self.beat(self.first, 10)
+        self.beat(self.first, 70)
+        self.assertFalse(self.beat(self.second, 5))
+
+        self.assertEqual(self.stored(self.first), 70)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_persists_every_heartbeat(self):
+        self.assertTrue(self.beat(self.first, 10))
+        self.assertTrue(self.beat(self.first, 40))
+        self.assertEqual(self.stored(self.first), 40)
+
+        response = self.client.get(f'/api/courses/{self.course.pk}/')
+        self.assertEqual(response.data['resume']['position_seconds'], 40)
+
+
+class EnrollmentListQueryTests(TestCase):
+    """The enrollment list costs the same number of queries for any number of enrollments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        for i in range(5):
+            course = Course.objects.create(
+                title=f'Course {i}', description='Diet therapy basics', category=category,
+                duration='1h', is_published=True,
+            )
+            videos = [Video.objects.create(course=course, title=f'Video {j}', duration='10:00', order=j) for j in range(3)]
+            enrollment = Enrollment.objects.create(user=cls.learner, course=course, last_watched=videos[0])
+            VideoWatch.objects.record([(enrollment.pk, videos[0].pk), (enrollment.pk, videos[1].pk)])
+            PlaybackPosition.objects.create(enrollment=enrollment, video=videos[1], position_seconds=30)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def test_query_count(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/enrollments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class EnrollmentAccessTests(TestCase):
+    """Enrollment checks with a process-local cache, which other workers cannot invalidate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        cls.course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_enrollment_from_another_worker_is_seen(self):
+        self.assertFalse(is_enrolled(self.learner, self.course.pk))
+        # bulk_create sends no signals, like a write made by another process
+        Enrollment.objects.bulk_create([Enrollment(user=self.learner, course=self.course)])
+
+        self.assertTrue(is_enrolled(self.learner, self.course.pk))
+        with self.assertNumQueries(1):
+            self.assertTrue(is_enrolled(self.learner, self.course.pk))
+            self.assertTrue(is_enrolled(self.learner, self.course.pk))
+
+
+class BulkAssignTests(TestCase):
+    """Bulk enrollment reports and counts only the enrollments it inserted."""
+
+    def test_enrollment_made_concurrently(self):
+        learners = [User.objects.create_user(email=f'learner{i}@example.com', password='x') for i in range(2)]
+        category = Category.objects.create(name='Nutrition')
+        course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        Enrollment.objects.create(user=learners[0], course=course)
+
+        # The lookup misses the first learner's enrollment, as if it was made meanwhile
+        with mock.patch('courses.enrollments._existing_pairs', return_value=set()):
+            report = bulk_assign([{'user_id': learner.pk, 'course_id': course.pk} for learner in learners])
+
+        self.assertEqual([entry['status'] for entry in report], ['already_enrolled', 'enrolled'])
+        course.refresh_from_db()
+        self.assertEqual(course.enrollment_count, 2)
+
+
+class FeedbackUpsertTests(TestCase):
+    """Posting feedback twice updates the learner's feedback for the course."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_post_updates(self):
+        learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        Enrollment.objects.create(user=learner, course=course)
+        client = APIClient()
+        client.force_authenticate(learner)
+
+        first = client.post('/api/feedbacks/', {'course': course.pk, 'rating': 4, 'comment': 'Good'}, format='json')
+        second = client.post('/api/feedbacks/', {'course': course.pk, 'rating': 5, 'comment': 'Great'}, format='json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        stored = Feedback.objects.get()
+        self.assertEqual((second.data['id'], second.data['rating']), (stored.pk, 5))
+        self.assertEqual(second.data['created_at'], first.data['created_at'])
+
+    def test_unenrolled_user_is_rejected(self):
+        learner = User.objects.create_user(email='visitor@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        client = APIClient()
+        client.force_authenticate(learner)
+
+        response = client.post('/api/feedbacks/', {'course': course.pk, 'rating': 1, 'comment': 'Bad'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Feedback.objects.exists())
+
+
+class IssueCertificatesTests(TestCase):
+    """Issuance returns and counts only the certificates it inserted."""
+
+    def test_certificate_requested_concurrently(self):
+        learners = [User.objects.create_user(email=f'learner{i}@example.com', password='x') for i in range(3)]
+        category = Category.objects.create(name='Nutrition')
+        course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        for learner in learners:
+            Enrollment.objects.create(user=learner, course=course, progress=100)
+        completers = list(completed_without_certificate([course.pk]))
+        # A learner requests their certificate between the lookup and the insert
+        requested = Certificate.objects.bulk_create([Certificate(user=learners[0], course=course, full_name='Learner')])[0]
+
+        with mock.patch('courses.issuance.completed_without_certificate', return_value=Enrollment.objects.filter(
+            pk__in=[enrollment.pk for enrollment in completers],
+        )):
+            certificate_ids = issue_certificates([course.pk])
+
+        self.assertEqual(len(certificate_ids), 2)
+        self.assertNotIn(requested.pk, certificate_ids)
+        self.assertEqual(
+            set(Certificate.objects.filter(pk__in=certificate_ids).values_list('user_id', flat=True)),
+            {learners[1].pk, learners[2].pk},
+        )
+
+
+class CertificateRenderTests(TestCase):
+    """Certificates are not rendered with fonts that cannot draw Arabic."""
+
+    def test_arabic_needs_a_ttf_font(self):
+        data = {'full_name': 'Sara Ahmed', 'course_title': 'Nutrition', 'coach_name': '', 'issue_date': '2025/01/01'}
+        with self.assertRaises(MissingFontError):
+            render_certificate(data, CertificateTemplate())
+
+    @skipUnless(settings.CERTIFICATE_FONT, 'needs CERTIFICATE_FONT')
+    def test_images_are_embedded_as_binary_for_that_render_only(self):
+        use_a85 = rl_config.useA85
+        with tempfile.TemporaryDirectory() as directory:
+            background = os.path.join(directory, 'background.png')
+            Image.new('RGB', (40, 30), 'white').save(background)
+            template = CertificateTemplate(background=background, font=settings.CERTIFICATE_FONT)
+            data = {'full_name': 'Sara', 'course_title': 'Nutrition', 'coach_name': '', 'issue_date': '2025/01/01'}
+
+            pdf = render_certificate(data, template)
+
+        self.assertNotIn(b'ASCII85Decode', pdf)
+        self.assertEqual(rl_config.useA85, use_a85)
+
+    @override_settings(CERTIFICATE_RENDERING=True, CERTIFICATE_FONT='', CERTIFICATE_BOLD_FONT='')
+    def test_startup_check_requires_a_font(self):
+        self.assertEqual([error.id for error in check_certificate_font(None)], ['courses.E001'])
+        with self.settings(CERTIFICATE_RENDERING=False):
+            self.assertEqual(check_certificate_font(None), [])
+
+
+class CloudinaryDownloadTests(TestCase):
+    """Files on Cloudinary are only handed out as short-lived signed URLs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        cls.course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        Enrollment.objects.create(user=cls.learner, course=cls.course)
+        # Naming an existing upload does not touch Cloudinary
+        cls.pdf = PDF.objects.create(course=cls.course, title='Guide', pdf_file='media/pdfs/guide_x1.pdf')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def test_download_redirects_to_a_signed_url(self):
+        response = self.client.get(f'/api/courses/{self.course.pk}/pdfs/{self.pdf.pk}/download/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/raw/download?', response['Location'])
+        self.assertIn('expires_at=', response['Location'])
+        self.assertIn('signature=', response['Location'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_listing_exposes_no_permanent_url(self):
+        response = self.client.get(f'/api/courses/{self.course.pk}/pdfs/')
+
+        pdf = response.data['results'][0]
+        self.assertNotIn('pdf_file', pdf)
+        self.assertIn('expires_at=', pdf['pdf_url'])
+        self.assertNotIn('res.cloudinary.com', str(response.data))
+
+
+@mock.patch('courses.signals.schedule_certificate_render')
+class CertificateIssueTests(TestCase):
+    """Certificates are only issued to, and verified for, learners who completed the course."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user(email='learner@example.com', password='x')
+        category = Category.objects.create(name='Nutrition')
+        cls.course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def request_certificate(self):
+        return self.client.post(
+            '/api/certificates/', {'course_id': self.course.pk, 'full_name': 'Sara Ahmed'}, format='json',
+        )
+
+    def verify(self, certificate):
+        return APIClient().get(f'/api/certificates/verify/{certificate.verification_code}/')
+
+    def test_unenrolled_user_is_rejected(self, schedule):
+        self.assertEqual(self.request_certificate().status_code, 403)
+        self.assertFalse(Certificate.objects.exists())
+
+    def test_unfinished_course_is_rejected(self, schedule):
+        Enrollment.objects.create(user=self.learner, course=self.course, progress=50)
+        self.assertEqual(self.request_certificate().status_code, 403)
+
+    def test_completed_course(self, schedule):
+        Enrollment.objects.create(user=self.learner, course=self.course, progress=100)
+        self.assertEqual(self.request_certificate().status_code, 201)
+
+        response = self.verify(Certificate.objects.get())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['valid'])
+
+    def test_certificate_without_completion_does_not_verify(self, schedule):
+        certificate = Certificate.objects.create(user=self.learner, course=self.course, full_name='Sara Ahmed')
+
+        response = self.verify(certificate)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['valid'])
+
+
+class VideoMoveTests(TestCase):
+    """Moving videos between courses keeps counters and watched bitmaps in step."""
+
+    def test_video_without_course_moved_into_a_course(self):
+        category = Category.objects.create(name='Nutrition')
+        course = Course.objects.create(
+            title='Clinical nutrition', description='Diet therapy basics', category=category,
+            duration='1h', is_published=True,
+        )
+        video = Video.objects.create(course=None, title='Intro', duration='10:00')
+
+        video.course = course
+        video.save()
+
+        course.refresh_from_db()
+        video.refresh_from_db()
+        self.assertEqual((course.video_count, course.total_duration_seconds), (1, 600))
+        self.assertIsNotNone(video.slot)
@@ -0,0 +1,120 @@
+"""
+Single-statement insert-or-ignore for rows guarded by a unique constraint.
+
+``INSERT ... ON CONFLICT (...) DO NOTHING RETURNING pk`` (Postgres, SQLite)
+both creates the row and tells whether it already existed, so "create
+unless it exists" needs no prior lookup and cannot fail with an
+IntegrityError when the same request is retried concurrently. The
+multi-row form tells bulk writers exactly which rows they inserted, as
+opposed to rows that already existed or were inserted concurrently.
+"""
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models.signals import post_save, pre_save
+
+
+def insert_or_ignore(model, conflict_fields, **values):
+    """
+    Insert a ``model`` row built from ``values`` unless one with the same
+    ``conflict_fields`` exists. Returns the saved instance, or ``None`` when
+    the row already existed.
+
+    post_save is sent for inserted rows like ``Model.save`` would. pre_save
+    has to be sent before the statement runs, so receivers also see it for
+    rows that turn out to exist already (then without a post_save).
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    instance = model(**values)
+
+    if connection.vendor not in ('postgresql', 'sqlite') or not connection.features.can_return_columns_from_insert:
+        try:
+            with transaction.atomic(using=using):
+                instance.save(force_insert=True, using=using)
+        except IntegrityError:
+            return None
+        return instance
+
+    pre_save.send(sender=model, instance=instance, raw=False, using=using, update_fields=None)
+    meta = model._meta
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    params = [
+        field.get_db_prep_save(field.pre_save(instance, add=True), connection=connection)
+        for field in fields
+    ]
+    sql = 'INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT ({conflict}) DO NOTHING RETURNING {pk}'.format(
+        table=quote(meta.db_table),
+        columns=', '.join(quote(field.column) for field in fields),
+        values=', '.join(['%s'] * len(fields)),
+        conflict=', '.join(quote(meta.get_field(name).column) for name in conflict_fields),
+        pk=quote(meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    instance.pk = row[0]
+    instance._state.adding = False
+    instance._state.db = using
+    post_save.send(sender=model, instance=instance, created=True, update_fields=None, raw=False, using=using)
+    return instance
+
+
+def bulk_insert_or_ignore(model, conflict_fields, objs, batch_size=1000):
+    """
+    Insert the ``objs`` whose ``conflict_fields`` values do not exist yet.
+    Returns the inserted instances, with their primary keys set.
+
+    Like ``bulk_create`` no signals are sent.
+    """
+    objs = list(objs)
+    if not objs:
+        return []
+    using = router.db_for_write(model)
+    connection = connections[using]
+    meta = model._meta
+    conflict = [meta.get_field(name) for name in conflict_fields]
+
+    if connection.vendor not in ('postgresql', 'sqlite') or not connection.features.can_return_rows_from_bulk_insert:
+        inserted = []
+        for instance in objs:
+            try:
+                with transaction.atomic(using=using):
+                    model._base_manager.using(using).bulk_create([instance])
+            except IntegrityError:
+                continue
+            inserted.append(instance)
+        return inserted
+
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    batch_size = min(batch_size, connection.ops.bulk_batch_size(fields, objs) or batch_size)
+    by_key = {tuple(getattr(instance, field.attname) for field in conflict): instance for instance in objs}
+    inserted = []
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        params = [
+            field.get_db_prep_save(field.pre_save(instance, add=True), connection=connection)
+            for instance in batch
+            for field in fields
+        ]
+        row = '({})'.format(', '.join(['%s'] * len(fields)))
+        sql = 'INSERT INTO {table} ({columns}) VALUES {rows} ON CONFLICT ({conflict}) DO NOTHING RETURNING {returning}'.format(
+            table=quote(meta.db_table),
+            columns=', '.join(quote(field.column) for field in fields),
+            rows=', '.join([row] * len(batch)),
+            conflict=', '.join(quote(field.column) for field in conflict),
+            returning=', '.join(quote(field.column) for field in [meta.pk, *conflict]),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        for pk, *key in rows:
+            instance = by_key[tuple(key)]
+            instance.pk = pk
+            instance._state.adding = False
+            instance._state.db = using
+            inserted.append(instance)
+    return inserted
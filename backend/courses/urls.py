@@ -11,7 +11,10 @@ from .views import (
     FeedbackListCreateView, FeedbackDetailView, ReviewPhotoListView,
     AdminReviewPhotoListCreateView, AdminReviewPhotoDetailView, MarkVideoWatchedView,
     AdminCategoryCreateView, AdminCategoryUpdateView, AdminCategoryDeleteView,
-    ContactMessageCreateView, AdminContactMessageListView,
+    ContactMessageCreateView, AdminContactMessageListView, WatchEventBatchView,
+    PlaybackHeartbeatView, CourseContentView, AdminBulkAssignCourseView, AdminBulkUnassignCourseView,
+    AdminAnalyticsView, AdminIssueCertificatesView, CertificateDownloadView, CoursePDFDownloadView,
+    CertificateVerifyView,
 )
 from rest_framework.routers import DefaultRouter
 router = DefaultRouter()
@@ -21,10 +24,14 @@ urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category_list'),
     path('courses/', CourseListView.as_view(), name='course_list'),
     path('courses/<int:pk>/', CourseDetailView.as_view(), name='course_detail'),
+    path('courses/<int:course_id>/content/', CourseContentView.as_view(), name='course_content'),
     path('courses/<int:course_id>/videos/', CourseVideosView.as_view(), name='course_videos'),
     path('courses/<int:course_id>/pdfs/', CoursePDFsView.as_view(), name='course_pdfs'),
+    path('courses/<int:course_id>/pdfs/<int:pk>/download/', CoursePDFDownloadView.as_view(), name='course_pdf_download'),
     path('courses/<int:course_id>/enroll/', EnrollmentCreateView.as_view(), name='course_enroll'),
     path('courses/<int:course_id>/videos/<int:video_id>/watch/', MarkVideoWatchedView.as_view(), name='mark_video_watched'),
+    path('courses/<int:course_id>/videos/<int:video_id>/position/', PlaybackHeartbeatView.as_view(), name='playback_heartbeat'),
+    path('watch-events/', WatchEventBatchView.as_view(), name='watch_event_batch'),
     path('enrollments/', EnrollmentListView.as_view(), name='enrollment_list'),
     path('enrollments/create/', EnrollmentCreateView.as_view(), name='enrollment_create'),
     path('enrollments/<int:pk>/update/', EnrollmentUpdateView.as_view(), name='enrollment_update'),
@@ -35,6 +42,8 @@ urlpatterns = [
     
     path('reviews/', ReviewPhotoListView.as_view(), name='review_photo_list'),
     path("certificates/", UserCertificateListView.as_view(), name="user_certificates"),
+    path("certificates/<int:pk>/download/", CertificateDownloadView.as_view(), name="certificate_download"),
+    path("certificates/verify/<str:code>/", CertificateVerifyView.as_view(), name="certificate_verify"),
     path('contact/', ContactMessageCreateView.as_view(), name='contact_message_create'),
 
 # Admin endpoints
@@ -59,7 +68,11 @@ urlpatterns = [
     path('admin/users/<int:user_id>/enrollments/', AdminUserEnrollmentsView.as_view(), name='admin_user_enrollments'),
     path('admin/assign-course/', AdminAssignCourseView.as_view(), name='admin_assign_course'),
     path('admin/unassign-course/', AdminUnassignCourseView.as_view(), name='admin_unassign_course'),
+    path('admin/bulk-assign-courses/', AdminBulkAssignCourseView.as_view(), name='admin_bulk_assign_courses'),
+    path('admin/bulk-unassign-courses/', AdminBulkUnassignCourseView.as_view(), name='admin_bulk_unassign_courses'),
     path('admin/stats/', AdminStatsView.as_view(), name='admin_stats'),
+    path('admin/analytics/', AdminAnalyticsView.as_view(), name='admin_analytics'),
+    path('admin/issue-certificates/', AdminIssueCertificatesView.as_view(), name='admin_issue_certificates'),
     path('admin/reviews/', AdminReviewPhotoListCreateView.as_view(), name='admin_review_list_create'),
     path('admin/reviews/<int:pk>/', AdminReviewPhotoDetailView.as_view(), name='admin_review_detail'),
 ]+ router.urls
\ No newline at end of file
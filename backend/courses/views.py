@@ -3,7 +3,15 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from .models import Course, Video, Enrollment, Category, PDF, Certificate, Feedback, ReviewPhoto, ContactMessage
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from datetime import timedelta
+from .models import Course, Video, Enrollment, VideoWatch, PendingWatchEvent, PlaybackPosition, AnalyticsRollup, Category, PDF, Certificate, Feedback, ReviewPhoto, ContactMessage
+from .models import normalize_verification_code
 from django.http import FileResponse, HttpResponseBadRequest
 from rest_framework.views import APIView
 from courses.models import Course
@@ -16,21 +24,43 @@ from .serializers import (
     CourseListSerializer, CourseDetailSerializer, VideoSerializer,
     EnrollmentSerializer, EnrollmentCreateSerializer, CategorySerializer, PDFSerializer, CertificateSerializer,
     AdminAssignCourseSerializer, AdminUnassignCourseSerializer, FeedbackSerializer, ReviewPhotoSerializer,
-    ContactMessageSerializer,
+    ContactMessageSerializer, WatchEventBatchSerializer, HeartbeatSerializer, AdminBulkEnrollmentSerializer,
+    AdminIssueCertificatesSerializer,
 )
 from .permissions import IsStaffUser
+from . import bitset
+from .access import is_enrolled
+from .cache import CatalogCacheMixin, get_catalog_version, shared_cache_configured
+from .downloads import serve_file
+from .enrollments import bulk_assign, bulk_unassign, summarize
+from .issuance import issue_certificates
+from .conditional import ConditionalGetMixin
+from .analytics import week_start
+from .search import search_courses
+from .stats import read_stats, reconcile_stats
+from .tasks import schedule_certificate_batch, schedule_certificate_render
+from .upsert import insert_or_ignore
+from .playback import cached_resume, get_resume, record_heartbeat
+from .progress import apply_watch_events, compute_progress, progress_report, write_behind_enabled
 
 
 
 User = get_user_model()
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     """API endpoint for listing all categories."""
     
+    catalog_cache_name = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (AllowAny,)
+    
+    def get_conditional_state(self):
+        if shared_cache_configured():
+            # Any category change bumps the catalog version
+            return {'catalog_version': get_catalog_version()}
+        return Category.objects.aggregate(total=Count('id'), updated=Max('updated_at'))
 
 
 class AdminCategoryCreateView(generics.CreateAPIView):
@@ -56,37 +86,156 @@ class AdminCategoryDeleteView(generics.DestroyAPIView):
     permission_classes = (IsStaffUser,)
 
 
-class CourseListView(generics.ListAPIView):
+class CourseListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     """API endpoint for listing all published courses."""
     
+    catalog_cache_name = 'courses'
     serializer_class = CourseListSerializer
     permission_classes = (AllowAny,)
    # pagination_class = None
     
     def get_queryset(self):
-        queryset = Course.objects.filter(is_published=True)
+        queryset = Course.objects.with_stats().filter(is_published=True)
         
         # Filter by category if provided
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category__name__icontains=category)
         
-        # Search by title or description
+        # Full-text search on title and description
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(title__icontains=search) | queryset.filter(description__icontains=search)
+            queryset = search_courses(queryset, search)
         
         return queryset
+    
+    def get_conditional_state(self):
+        if shared_cache_configured():
+            # Every course, video and category change bumps the catalog version,
+            # so validating costs one cache read instead of a join over the catalog
+            return {'catalog_version': get_catalog_version()}
+        # Aggregated over all courses so that unpublishing also changes the state
+        return Course.objects.aggregate(
+            course_total=Count('id', distinct=True),
+            course_updated=Max('updated_at'),
+            video_total=Count('videos', distinct=True),
+            video_updated=Max('videos__updated_at'),
+            category_total=Count('category', distinct=True),
+            category_updated=Max('category__updated_at'),
+        )
 
 
-class CourseDetailView(generics.RetrieveAPIView):
-    """API endpoint for viewing course details."""
+class CourseDetailView(ConditionalGetMixin, CatalogCacheMixin, generics.RetrieveAPIView):
+    """
+    API endpoint for viewing course details.
+    
+    The course document is the same for every viewer and is served from the
+    catalog cache; only the caller's enrollment overlay is computed per request.
+    """
     
+    catalog_cache_name = 'course_detail'
+    conditional_vary_on_user = True
     serializer_class = CourseDetailSerializer
     permission_classes = (AllowAny,)
     
     def get_queryset(self):
-        return Course.objects.filter(is_published=True)
+        return Course.objects.with_stats().filter(is_published=True).prefetch_related('videos')
+    
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.data = {**response.data, **self.get_enrollment_overlay()}
+        return response
+    
+    def get_user_enrollment(self):
+        user = self.request.user
+        return Enrollment.objects.filter(
+            user_id=user.pk if user.is_authenticated else None, course_id=self.kwargs['pk'],
+        )
+    
+    def get_enrollment_overlay(self):
+        """Per-user fields layered over the shared course document."""
+        enrollment = None
+        if is_enrolled(self.request.user, self.kwargs['pk']):
+            enrollment = self.get_user_enrollment().select_related('last_watched').with_progress().first()
+        if enrollment is None:
+            return {'is_enrolled': False, 'watched_video_ids': [], 'last_watched': None, 'resume': None}
+        last_watched = enrollment.current_last_watched
+        return {
+            'is_enrolled': True,
+            'watched_video_ids': enrollment.watched_video_ids,
+            'last_watched': last_watched.id if last_watched else None,
+            'resume': get_resume(enrollment),
+        }
+    
+    def get_conditional_state(self):
+        enrollment = self.get_user_enrollment()
+        watches = VideoWatch.objects.filter(enrollment__in=enrollment.values('pk')).order_by().values('enrollment')
+        pending = PendingWatchEvent.objects.filter(enrollment__in=enrollment.values('pk')).order_by().values('enrollment')
+        positions = PlaybackPosition.objects.filter(enrollment__in=enrollment.values('pk')).order_by().values('enrollment')
+        state = Course.objects.filter(pk=self.kwargs['pk'], is_published=True).annotate(
+            video_total=Count('videos'),
+            video_updated=Max('videos__updated_at'),
+            is_enrolled=Exists(enrollment),
+            last_watched_id=Subquery(enrollment.values('last_watched_id')[:1]),
+            watched_total=Subquery(watches.annotate(total=Count('pk')).values('total')),
+            watched_updated=Subquery(watches.annotate(latest=Max('last_watched_at')).values('latest')),
+            pending_latest=Subquery(pending.annotate(latest=Max('pk')).values('latest')),
+            resume_updated=Subquery(positions.annotate(latest=Max('updated_at')).values('latest')),
+        ).values(
+            'updated_at', 'category__updated_at', 'video_total', 'video_updated',
+            'is_enrolled', 'last_watched_id', 'watched_total', 'watched_updated', 'pending_latest',
+            'resume_updated',
+        ).first()
+        if state and state['is_enrolled']:
+            # Heartbeats between persisted writes only live in the cache
+            resume = cached_resume(self.request.user.pk, self.kwargs['pk'])
+            if resume is not None:
+                state['resume'] = (resume['video_id'], resume['position_seconds'])
+                state['resume_updated'] = resume['updated_at']
+        return state
+
+
+class CourseContentView(APIView):
+    """
+    API endpoint for everything the course player needs (only for enrolled users).
+    
+    Returns the course with its ordered videos, its PDFs and the caller's
+    progress state (watched videos, last watched video, resume position) in
+    one response, after a single enrollment check.
+    """
+    
+    permission_classes = (IsAuthenticated,)
+    
+    def get(self, request, course_id):
+        if not is_enrolled(request.user, course_id):
+            return Response(
+                {"error": "You are not enrolled in this course"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        
+        course = get_object_or_404(
+            Course.objects.with_stats().prefetch_related('videos', 'pdfs'), id=course_id, is_published=True,
+        )
+        enrollment = Enrollment.objects.filter(user=request.user, course=course).select_related(
+            'last_watched',
+        ).with_progress().first()
+        if enrollment is None:
+            return Response(
+                {"error": "You are not enrolled in this course"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        enrollment.course = course
+        
+        context = self.get_serializer_context()
+        return Response({
+            'course': CourseDetailSerializer(course, context=context).data,
+            'pdfs': PDFSerializer(course.pdfs.all(), many=True, context=context).data,
+            'progress': {**progress_report(enrollment), 'resume': get_resume(enrollment)},
+        })
+    
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
 
 
 class CourseVideosView(generics.ListAPIView):
@@ -100,9 +249,7 @@ class CourseVideosView(generics.ListAPIView):
         course = get_object_or_404(Course, id=course_id, is_published=True)
         
         # Check if user is enrolled
-        is_enrolled = Enrollment.objects.filter(user=self.request.user, course=course).exists()
-        
-        if not is_enrolled:
+        if not is_enrolled(self.request.user, course.id):
             return Video.objects.none()
         
         return Video.objects.filter(course=course)
@@ -119,9 +266,7 @@ class CoursePDFsView(generics.ListAPIView):
         course = get_object_or_404(Course, id=course_id, is_published=True)
         
         # Check if user is enrolled
-        is_enrolled = Enrollment.objects.filter(user=self.request.user, course=course).exists()
-        
-        if not is_enrolled:
+        if not is_enrolled(self.request.user, course.id):
             return PDF.objects.none()
         
         return PDF.objects.filter(course=course)
@@ -134,7 +279,7 @@ class EnrollmentListView(generics.ListAPIView):
     permission_classes = (IsAuthenticated,)
     
     def get_queryset(self):
-        return Enrollment.objects.filter(user=self.request.user)
+        return Enrollment.objects.filter(user=self.request.user).for_listing()
 
 
 class EnrollmentCreateView(generics.CreateAPIView):
@@ -162,16 +307,13 @@ class EnrollmentCreateView(generics.CreateAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check if already enrolled
-        if Enrollment.objects.filter(user=request.user, course_id=course_id).exists():
+        # Create the enrollment unless it already exists, in one statement
+        if insert_or_ignore(Enrollment, ('user', 'course'), user=request.user, course=course) is None:
             return Response(
                 {'message': 'You are already enrolled in this course.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create enrollment
-        Enrollment.objects.create(user=request.user, course_id=course_id)
-        
         return Response(
             {'message': 'Successfully enrolled in the course.'},
             status=status.HTTP_201_CREATED
@@ -188,9 +330,10 @@ class EnrollmentUpdateView(generics.UpdateAPIView):
         return Enrollment.objects.filter(user=self.request.user)
 
 
-class FreeVideoListView(generics.ListAPIView):
+class FreeVideoListView(CatalogCacheMixin, generics.ListAPIView):
     """API endpoint for listing all free videos (public access)."""
     
+    catalog_cache_name = 'free_videos'
     queryset = Video.objects.filter(is_free=True).order_by('order')
     serializer_class = VideoSerializer
     permission_classes = (AllowAny,)
@@ -203,8 +346,11 @@ class MarkVideoWatchedView(APIView):
     
     def post(self, request, course_id, video_id):
         try:
+            if not is_enrolled(request.user, course_id):
+                raise Enrollment.DoesNotExist
+            
             # Get the enrollment
-            enrollment = Enrollment.objects.get(
+            enrollment = Enrollment.objects.select_related('course').with_progress().get(
                 user=request.user,
                 course_id=course_id,
             )
@@ -212,45 +358,35 @@ class MarkVideoWatchedView(APIView):
             # Get the video
             video = get_object_or_404(Video, id=video_id, course_id=course_id)
 
-            # Ensure watched_video_ids is a list
-            watched_ids = enrollment.watched_video_ids or []
-            if not isinstance(watched_ids, list):
-                try:
-                    import json
-                    watched_ids = json.loads(watched_ids) if watched_ids else []
-                except Exception:
-                    watched_ids = []
-
-            # Normalise to integers for comparison
-            normalized_ids = {int(v) for v in watched_ids if str(v).isdigit()}
-            video_id_int = int(video_id)
-
-            # Check if already watched
-            is_new = video_id_int not in normalized_ids
-
-            # Add video to watched list if not already there
-            if is_new:
-                normalized_ids.add(video_id_int)
-
-            # Persist watched IDs and last watched video
-            enrollment.watched_video_ids = sorted(normalized_ids)
-            enrollment.last_watched = video
-
-            # Calculate and persist progress based on watched videos
-            total_videos = Video.objects.filter(course_id=course_id).count()
-            if total_videos <= 0:
-                enrollment.progress = 0
-            else:
-                enrollment.progress = int((len(normalized_ids) / total_videos) * 100)
+            watched_ids = set(enrollment.watched_video_ids)
+            is_new = video.id not in watched_ids
+            watched_ids.add(video.id)
+            total_videos = enrollment.course.video_count
 
-            enrollment.save(update_fields=["watched_video_ids", "last_watched", "progress"])
+            if write_behind_enabled():
+                # Acknowledge now; flush_watch_events applies the event later
+                PendingWatchEvent.objects.create(enrollment=enrollment, video=video)
+                progress = max(enrollment.progress, compute_progress(len(watched_ids), total_videos))
+            else:
+                with transaction.atomic():
+                    # Re-read the bitmap under a row lock so concurrent marks keep each other's bits
+                    enrollment.watched_bitmap = Enrollment.objects.select_for_update().values_list(
+                        'watched_bitmap', flat=True,
+                    ).get(pk=enrollment.pk)
+                    # Single-row upsert; repeat watches only touch last_watched_at
+                    VideoWatch.objects.record([(enrollment.id, video.id)])
+                    enrollment.watched_bitmap = bitset.add(enrollment.watched_bitmap, video.slot)
+                    enrollment.last_watched = video
+                    enrollment.progress = compute_progress(enrollment.watched_count, total_videos)
+                    enrollment.save(update_fields=["last_watched", "watched_bitmap", "progress"])
+                progress = enrollment.progress
 
             return Response(
                 {
                     "message": "Video marked as watched",
-                    "progress": enrollment.progress,
+                    "progress": progress,
                     "is_new": is_new,
-                    "watched_video_ids": enrollment.watched_video_ids,
+                    "watched_video_ids": sorted(watched_ids),
                     "total_videos": total_videos,
                 },
                 status=status.HTTP_200_OK,
@@ -263,11 +399,64 @@ class MarkVideoWatchedView(APIView):
             )
 
 
+class WatchEventBatchView(generics.GenericAPIView):
+    """
+    API endpoint for batched player events.
+    
+    Accepts many ``(course_id, video_id, position_seconds, watched)`` events,
+    possibly for several enrollments, and returns the recomputed progress of
+    every affected enrollment along with any rejected events.
+    """
+    
+    serializer_class = WatchEventBatchSerializer
+    permission_classes = (IsAuthenticated,)
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        enrollments, rejected = apply_watch_events(request.user, serializer.validated_data['events'])
+        return Response({'enrollments': enrollments, 'rejected': rejected}, status=status.HTTP_200_OK)
+
+
+class PlaybackHeartbeatView(generics.GenericAPIView):
+    """
+    API endpoint for player position heartbeats.
+    
+    With a shared cache, heartbeats are coalesced in it and persisted at most
+    once per PLAYBACK_PERSIST_INTERVAL seconds per enrollment; pause and
+    ended events are always persisted.
+    """
+    
+    serializer_class = HeartbeatSerializer
+    permission_classes = (IsAuthenticated,)
+    
+    def post(self, request, course_id, video_id):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        enrollment = None
+        if is_enrolled(request.user, course_id):
+            enrollment = Enrollment.objects.filter(
+                user=request.user, course_id=course_id, course__videos__id=video_id,
+            ).only('id', 'user_id', 'course_id').first()
+        if enrollment is None:
+            return Response(
+                {"error": "You are not enrolled in this course or the video does not belong to it"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        
+        resume, persisted = record_heartbeat(
+            enrollment, video_id, serializer.validated_data['position_seconds'],
+            final=serializer.validated_data['event'] != 'heartbeat',
+        )
+        return Response({'resume': resume, 'persisted': persisted}, status=status.HTTP_200_OK)
+
+
 # Admin Views
 class AdminCourseListView(generics.ListAPIView):
     """Admin endpoint for listing all courses (including unpublished)."""
     
-    queryset = Course.objects.all()
+    queryset = Course.objects.with_stats()
     serializer_class = CourseListSerializer
     permission_classes = (IsStaffUser,)
 
@@ -371,23 +560,85 @@ class AdminUserDeleteView(generics.DestroyAPIView):
 
 
 class AdminStatsView(generics.GenericAPIView):
-    """Admin endpoint for dashboard statistics."""
+    """
+    Admin endpoint for dashboard statistics.
+    
+    Reads the signal-maintained counters in one query; ``?exact=1`` recounts
+    the tables instead and stores the corrected values.
+    """
     
     permission_classes = (IsStaffUser,)
     
     def get(self, request):
-        stats = {
-            'total_courses': Course.objects.count(),
-            'published_courses': Course.objects.filter(is_published=True).count(),
-            'total_videos': Video.objects.count(),
-            'total_users': User.objects.count(),
-            'total_enrollments': Enrollment.objects.count(),
-            'total_pdfs': PDF.objects.count(),
-            'total_certificates': Certificate.objects.count(),
-        }
+        if request.query_params.get('exact') in ('1', 'true'):
+            stats, _ = reconcile_stats()
+        else:
+            stats = read_stats()
         return Response(stats)
 
 
+class AdminAnalyticsView(generics.GenericAPIView):
+    """
+    Admin endpoint for time-series analytics, read from the rollup tables.
+    
+    Query parameters: ``period`` (day|week), ``course`` (omit for all
+    courses), ``metric`` (comma-separated, default all), ``start``/``end``
+    (YYYY-MM-DD; default the last 30 days or 12 weeks). A range spans at
+    most MAX_SPAN days for its period.
+    """
+    
+    permission_classes = (IsStaffUser,)
+    MAX_SPAN = {AnalyticsRollup.PERIOD_DAY: 366, AnalyticsRollup.PERIOD_WEEK: 5 * 366}
+    
+    def get(self, request):
+        params = request.query_params
+        period = params.get('period', AnalyticsRollup.PERIOD_DAY)
+        if period not in dict(AnalyticsRollup.PERIOD_CHOICES):
+            return Response({'error': 'period must be day or week'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        metrics = dict(AnalyticsRollup.METRIC_CHOICES)
+        selected = [m for m in params.get('metric', '').split(',') if m] or list(metrics)
+        if any(metric not in metrics for metric in selected):
+            return Response({'error': f"metric must be among: {', '.join(metrics)}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            end = parse_date(params['end']) if params.get('end') else timezone.localdate()
+            days = 29 if period == AnalyticsRollup.PERIOD_DAY else 7 * 11
+            start = parse_date(params['start']) if params.get('start') else end - timedelta(days=days)
+            course_id = int(params['course']) if params.get('course') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid start, end or course'}, status=status.HTTP_400_BAD_REQUEST)
+        if start is None or end is None or start > end:
+            return Response({'error': 'Invalid start, end or course'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > self.MAX_SPAN[period]:
+            return Response(
+                {'error': f'The range may span at most {self.MAX_SPAN[period]} days for period {period}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        step = timedelta(days=1 if period == AnalyticsRollup.PERIOD_DAY else 7)
+        if period == AnalyticsRollup.PERIOD_WEEK:
+            start, end = week_start(start), week_start(end)
+        
+        rows = AnalyticsRollup.objects.filter(
+            period=period, metric__in=selected, period_start__range=(start, end),
+        )
+        rows = rows.filter(course_id=course_id) if course_id else rows.filter(course__isnull=True)
+        values = {(metric, day): value for metric, day, value in rows.values_list('metric', 'period_start', 'value')}
+        
+        periods = []
+        day = start
+        while day <= end:
+            periods.append(day)
+            day += step
+        return Response({
+            'period': period,
+            'course': course_id,
+            'periods': periods,
+            'series': {metric: [values.get((metric, day), 0) for day in periods] for metric in selected},
+        })
+
+
 class AdminPDFListView(generics.ListAPIView):
     """Admin endpoint for listing all PDFs."""
     
@@ -437,20 +688,118 @@ class UserCertificateListView(generics.ListCreateAPIView):
         if not full_name:
             return Response({"error": "full_name is required"}, status=400)
 
-        # Prevent duplicates
-        if Certificate.objects.filter(user=user, course_id=course_id).exists():
-            return Response({"message": "Certificate already exists"}, status=200)
+        enrollment = Enrollment.objects.filter(
+            user=user, course_id=course_id,
+        ).select_related('course').with_progress().first()
+        if enrollment is None or enrollment.current_progress < 100:
+            return Response(
+                {"error": "You must complete this course to get its certificate"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
-        certificate = Certificate.objects.create(
+        # Prevent duplicates: a single insert that does nothing if the certificate exists
+        certificate = insert_or_ignore(
+            Certificate, ('user', 'course'),
             user=user,
             course_id=course_id,
             full_name=full_name,
         )
+        if certificate is None:
+            certificate = Certificate.objects.get(user=user, course_id=course_id)
+            if certificate.status == Certificate.STATUS_FAILED:
+                # Asking again retries a render that failed
+                Certificate.objects.filter(pk=certificate.pk).update(status=Certificate.STATUS_PENDING)
+                certificate.status = Certificate.STATUS_PENDING
+                schedule_certificate_render(certificate.pk)
+            return Response({"message": "Certificate already exists", "status": certificate.status}, status=200)
 
         serializer = self.get_serializer(certificate)
         return Response(serializer.data, status=201)
 
 
+class CertificateVerifyView(APIView):
+    """
+    Public endpoint for third parties to check a certificate by its
+    verification code. Only certificates of learners who completed the
+    course are valid. Answers are cacheable by browsers and proxies.
+    """
+    
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request, code):
+        completed = Enrollment.objects.filter(
+            user_id=OuterRef('user_id'), course_id=OuterRef('course_id'), progress__gte=100,
+        )
+        certificate = Certificate.objects.filter(
+            Exists(completed), verification_code=normalize_verification_code(code),
+        ).order_by().values('full_name', 'coach_name', 'issue_date', 'course__title')[:1]
+        certificate = next(iter(certificate), None)
+        if certificate is None:
+            response = Response({'valid': False}, status=status.HTTP_404_NOT_FOUND)
+            patch_cache_control(response, public=True, max_age=settings.VERIFICATION_NOT_FOUND_MAX_AGE)
+            return response
+        
+        response = Response({
+            'valid': True,
+            'full_name': certificate['full_name'],
+            'course_title': certificate['course__title'],
+            'coach_name': certificate['coach_name'],
+            'issue_date': certificate['issue_date'],
+        })
+        patch_cache_control(response, public=True, max_age=settings.VERIFICATION_MAX_AGE)
+        return response
+
+
+class CertificateDownloadView(APIView):
+    """API endpoint for downloading a certificate PDF (owner or staff)."""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        certificates = Certificate.objects.select_related('course')
+        if not request.user.is_staff:
+            certificates = certificates.filter(user=request.user)
+        certificate = get_object_or_404(certificates, pk=pk)
+        if certificate.status != Certificate.STATUS_READY or not certificate.pdf:
+            return Response({'status': certificate.status}, status=status.HTTP_409_CONFLICT)
+        return serve_file(request, certificate.pdf, filename=f'certificate-{certificate.course.title}.pdf')
+
+
+class CoursePDFDownloadView(APIView):
+    """API endpoint for downloading a course PDF (enrolled users or staff)."""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, course_id, pk):
+        pdf = get_object_or_404(PDF, pk=pk, course_id=course_id)
+        if not request.user.is_staff and not is_enrolled(request.user, course_id):
+            return Response({"error": "You are not enrolled in this course"}, status=status.HTTP_404_NOT_FOUND)
+        if not pdf.pdf_file:
+            return Response({'error': 'This PDF has no file'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_file(request, pdf.pdf_file)
+
+
+class AdminIssueCertificatesView(generics.GenericAPIView):
+    """
+    Admin endpoint to issue certificates to every learner who completed the
+    given courses (default: all). PDFs are rendered in the background.
+    """
+    
+    serializer_class = AdminIssueCertificatesSerializer
+    permission_classes = [IsStaffUser]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        certificate_ids = issue_certificates(
+            serializer.validated_data.get('course_ids'),
+            coach_name=serializer.validated_data.get('coach_name') or None,
+        )
+        schedule_certificate_batch(certificate_ids)
+        return Response({'issued': len(certificate_ids)}, status=status.HTTP_202_ACCEPTED)
+
+
 class AdminAssignCourseView(generics.CreateAPIView):
     """Admin endpoint to assign a course to a user."""
     
@@ -494,6 +843,26 @@ class AdminUnassignCourseView(generics.GenericAPIView):
             )
 
 
+class AdminBulkAssignCourseView(generics.GenericAPIView):
+    """Admin endpoint to enroll many users at once (JSON rows or CSV upload)."""
+    
+    serializer_class = AdminBulkEnrollmentSerializer
+    permission_classes = [IsStaffUser]
+    bulk_action = staticmethod(bulk_assign)
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = self.bulk_action(serializer.validated_data['rows'])
+        return Response({'summary': summarize(report), 'rows': report}, status=status.HTTP_200_OK)
+
+
+class AdminBulkUnassignCourseView(AdminBulkAssignCourseView):
+    """Admin endpoint to unenroll many users at once (JSON rows or CSV upload)."""
+    
+    bulk_action = staticmethod(bulk_unassign)
+
+
 class AdminUserEnrollmentsView(generics.ListAPIView):
     """Admin endpoint to view a user's enrollments."""
     
@@ -503,7 +872,7 @@ class AdminUserEnrollmentsView(generics.ListAPIView):
     
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
-        return Enrollment.objects.filter(user_id=user_id).select_related('course', 'last_watched')
+        return Enrollment.objects.filter(user_id=user_id).for_listing()
 
 
 class FeedbackListCreateView(generics.ListCreateAPIView):
@@ -522,6 +891,17 @@ class FeedbackListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         """Automatically set the user when creating feedback."""
         serializer.save(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        """Respond 201 for new feedback and 200 when the user's feedback was updated."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK,
+            headers=self.get_success_headers(serializer.data),
+        )
 
 
 class FeedbackDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -537,7 +917,7 @@ class FeedbackDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ==================== Review Photo Views ====================
 
-class ReviewPhotoListView(generics.ListAPIView):
+class ReviewPhotoListView(ConditionalGetMixin, generics.ListAPIView):
     """API endpoint for listing review photos for homepage (public)."""
     
     serializer_class = ReviewPhotoSerializer
@@ -546,6 +926,10 @@ class ReviewPhotoListView(generics.ListAPIView):
     def get_queryset(self):
         """Only return photos marked to show on homepage."""
         return ReviewPhoto.objects.filter(show_on_homepage=True)
+    
+    def get_conditional_state(self):
+        # Toggling show_on_homepage bumps updated_at, so whole-table state suffices
+        return ReviewPhoto.objects.aggregate(total=Count('id'), updated=Max('updated_at'))
 
 
 class AdminReviewPhotoListCreateView(generics.ListCreateAPIView):